@@ -2,10 +2,12 @@
 
 import click
 
-from orgcrawler.utils import jsonfmt, regions_for_service
+from orgcrawler.utils import jsonfmt, ndjsonfmt, regions_for_service
 from orgcrawler.cli.utils import (
     setup_crawler,
     format_responses,
+    format_response,
+    is_empty_response,
     get_payload_function_from_string,
     get_payload_function_from_file,
     print_version,
@@ -31,6 +33,19 @@ from orgcrawler.cli.utils import (
 @click.option('--payload-file', '-f',
     type=click.Path(exists=True),
     help='Path to file containing payload function.')
+@click.option('--credential-cache-dir',
+    type=click.Path(file_okay=False),
+    help='Directory in which to cache assumed role credentials until shortly before '
+         'they expire, so repeated runs can reuse them.')
+@click.option('--lazy-credentials',
+    is_flag=True,
+    default=False,
+    help='Assume the account role in each account only when the payload first runs there.')
+@click.option('--output', '-o',
+    default='json',
+    type=click.Choice(['json', 'ndjson']),
+    help='Output format [default: json].  "ndjson" prints one line of JSON per '
+         'account and region as soon as the payload completes there.')
 @click.option('--version', '-V',
     is_flag=True,
     callback=print_version,
@@ -38,7 +53,8 @@ from orgcrawler.cli.utils import (
     is_eager=True,
     help='Display version info and exit.')
 def main(master_role, account_role, regions, accounts,
-        service, payload_file, payload, payload_arg):
+        service, payload_file, credential_cache_dir, lazy_credentials, output,
+        payload, payload_arg):
     """
 Arguments:
 
@@ -56,8 +72,11 @@ Examples:
     orgcrawler -r OrgMasterRole --account-role S3Admin orgcrawler.payloads.list_buckets
     orgcrawler -r OrgMasterRole --service codecommit -f ~/my_payloads.py list_cc_repositories
     orgcrawler -r OrgMasterRole --service iam orgcrawler.payloads.get_account_aliases
+    orgcrawler -r OrgMasterRole --credential-cache-dir ~/.aws/orgcrawler-cache \\
+            orgcrawler.payloads.list_buckets
     orgcrawler -r OrgMasterRole --accounts app-test,app-prod \\
             --regions us-east-1,us-west-2 orgcrawler.payloads.config_describe_rules
+    orgcrawler -r OrgMasterRole --output ndjson orgcrawler.payloads.list_buckets | jq -c .Output
     """
     crawler_args = dict()
     if accounts:
@@ -68,12 +87,21 @@ Examples:
         crawler_args['regions'] = regions.split(',')
     if account_role:
         crawler_args['account_access_role'] = account_role
+    if credential_cache_dir:
+        crawler_args['credential_cache_dir'] = credential_cache_dir
+    if lazy_credentials:
+        crawler_args['lazy_credentials'] = True
     if payload_file:
         payload = get_payload_function_from_file(payload_file, payload)
     else:
         payload = get_payload_function_from_string(payload)
 
     crawler = setup_crawler(master_role, **crawler_args)
+    if output == 'ndjson':
+        for response in crawler.execute_iter(payload, *payload_arg, keep_responses=False):
+            if not is_empty_response(response):
+                click.echo(ndjsonfmt(format_response(response)))
+        return
     execution = crawler.execute(payload, *payload_arg)
     click.echo(jsonfmt(format_responses(execution)))
 
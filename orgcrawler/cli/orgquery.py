@@ -70,13 +70,18 @@ def validate_command_argument(ctx, param, value):
     default='json',
     type=click.Choice(['json', 'yaml']),
     help='Output format [default: json]')
+@click.option('--stats', '-s',
+    is_flag=True,
+    default=False,
+    help='Print AWS API call statistics for loading the organization to stderr. '
+         'No calls are made when the organization is loaded from the cache file.')
 @click.option('--version', '-V',
     is_flag=True,
     callback=print_version,
     expose_value=False,
     is_eager=True,
     help='Display version info and exit.')
-def main(command, argument, role, debug, format):
+def main(command, argument, role, debug, format, stats):
     """
 Arguments:
 
@@ -118,6 +123,7 @@ Examples:
     \b
     orgquery -r OrgMasterRole list_accounts_by_name
     orgquery -r OrgMasterRole -f yaml get_account_id_by_name webapps
+    orgquery -r OrgMasterRole --stats list_accounts_by_id
     """
 
     if format == 'json':
@@ -140,6 +146,12 @@ Examples:
         print(formatter(cmd(argument)))
     else:
         print(formatter(cmd()))
+    if stats:
+        load_stats = org.load_stats.dump()
+        if load_stats:
+            click.echo(formatter(load_stats), err=True)
+        else:
+            click.echo('No AWS API calls made: organization loaded from cache file', err=True)
 
 
 if __name__ == '__main__':
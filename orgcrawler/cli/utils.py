@@ -5,7 +5,7 @@ import importlib
 import click
 import pkg_resources
 
-from orgcrawler import crawlers, orgs
+from orgcrawler import crawlers, orgs, utils
 from orgcrawler.utils import get_master_account_id
 
 
@@ -33,18 +33,26 @@ def get_payload_function_from_file(file_name, payload_name):
     return getattr(module, payload_name)
 
 
-def setup_crawler(org_access_role, account_access_role=None, accounts=None, regions=None):
+def setup_crawler(org_access_role, account_access_role=None, accounts=None, regions=None,
+        credential_cache_dir=None, lazy_credentials=False):
     """
-    Returns a fully loaded orgcrawler.crawlers.Crawler object
+    Returns a fully loaded orgcrawler.crawlers.Crawler object.  If
+    ``credential_cache_dir`` is set, the crawler's assumed role credentials
+    are shared through files in that directory.  If ``lazy_credentials`` is
+    set, account credentials are loaded when first used by a payload.
     """
+    credential_cache = None
+    if credential_cache_dir:
+        credential_cache = utils.CredentialCache(cache_dir=credential_cache_dir)
     master_account_id = get_master_account_id(org_access_role)
-    my_org = orgs.Org(master_account_id, org_access_role)
+    my_org = orgs.Org(master_account_id, org_access_role, credential_cache=credential_cache)
     my_org.load()
     my_crawler = crawlers.Crawler(
         my_org,
         access_role=account_access_role,
         accounts=accounts,
         regions=regions,
+        lazy_credentials=lazy_credentials,
     )
     my_crawler.load_account_credentials()
     return my_crawler
@@ -68,14 +76,29 @@ def format_responses(execution):
     return(collector)
 
 
+def format_response(response):
+    """ generate dictionary of a single orgcrawler payload response """
+    return dict(
+        Account=response.account.name,
+        Region=response.region,
+        Output=response.payload_output,
+    )
+
+
+def is_empty_response(response):
+    '''
+    Return True if response output is empty or the payload raised an error.
+    Expects each response to be a list of dict.
+    '''
+    return response.exc_info is not None or not (
+        len(response.payload_output) == 1 and list() not in response.payload_output.values()
+    )
+
+
 def purge_empty_responses(execution):
     '''
     Return list of execution responses for which output is not empty.
     Expects each response to be a list of dict.
     '''
-    responses = [
-        r for r in execution.responses if (
-            len(r.payload_output) == 1 and list() not in r.payload_output.values()
-        )
-    ]
+    responses = [r for r in execution.responses if not is_empty_response(r)]
     return responses
@@ -1,12 +1,21 @@
+import os
 import sys
 import time
+import pickle
+import asyncio
+import inspect
+import traceback
+import contextlib
+import concurrent.futures
 
 from botocore.exceptions import ClientError
 
-from orgcrawler import utils
+from orgcrawler import orgs, utils
 
 
 DEFAULT_REGION = 'us-east-1'
+DEFAULT_THREAD_COUNT = 32
+DEFAULT_ASYNC_CONCURRENCY = 256
 
 
 class Crawler(object):
@@ -19,6 +28,10 @@ class Crawler(object):
         :access_role: string
         :accounts: string, list of string, or list of OrgAccount
         :regions: string, or list of string
+        :lazy_credentials: bool, if True account credentials are loaded
+            when a payload first uses them rather than all up front
+        :thread_count: int, maximum number of worker threads for loading
+            credentials and executing payloads [Default: DEFAULT_THREAD_COUNT]
         """
         self.org = org
         self.access_role = kwargs.get('access_role') or org.access_role
@@ -26,8 +39,9 @@ class Crawler(object):
         self.validate_accounts()
         self.regions = kwargs.get('regions') or self.all_regions
         self.validate_regions()
+        self.lazy_credentials = kwargs.get('lazy_credentials', False)
+        self.thread_count = kwargs.get('thread_count') or DEFAULT_THREAD_COUNT
         self.executions = []
-        self.exc_info = None
         self.error = None
 
     def is_valid_account(self, account):
@@ -90,66 +104,313 @@ class Crawler(object):
             self.validate_accounts()
 
     def load_account_credentials(self):
+        if self.lazy_credentials:
+            for account in self.accounts:
+                account.set_access_role(self.access_role)
+            return
+
         def get_credentials_for_account(account, crawler):
-            try:
-                account.load_credentials(crawler.access_role)
-            except ClientError as e:    # pragma: no cover
-                crawler.error = 'cannot assume role {} in account {}: {}'.format(
-                    crawler.access_role,
-                    account.name,
-                    e.response['Error']['Code']
-                )
-            except Exception:   # pragma: no cover
-                crawler.exc_info = sys.exc_info()
-        utils.queue_threads(
-            self.accounts,
-            get_credentials_for_account,
-            func_args=(self,),
-            thread_count=len(self.accounts)
-        )
-        if self.error:  # pragma: no cover
+            account.load_credentials(crawler.access_role)
+        try:
+            utils.run_tasks(
+                self.accounts,
+                get_credentials_for_account,
+                func_args=(self,),
+                thread_count=min(self.thread_count, len(self.accounts)),
+                error_policy=utils.COLLECT_ALL,
+            )
+        except utils.TaskErrors as e:
+            account, error = e.errors[0]
+            if not isinstance(error, ClientError):
+                raise error
+            self.error = 'cannot assume role {} in {} accounts, e.g. {}: {}'.format(
+                self.access_role,
+                len(e.errors),
+                account.name,
+                error.response['Error']['Code'],
+            )
             sys.exit(self.error)
-        if self.exc_info:   # pragma: no cover
-            raise self.exc_info[1].with_traceback(self.exc_info[2])
-
-    def execute(self, payload, *args, **kwargs):
-
-        def run_payload_in_account(account_region_map, execution, args, kwargs):
-            region = account_region_map['region']
-            account = account_region_map['account']
-            response = CrawlerResponse(region, account)
-            response.timer.start()
-            try:
-                response.payload_output = execution.payload(region, account, *args, **kwargs)
-            except Exception:
-                response.exc_info = sys.exc_info()
-                execution.errors += 1
-            response.timer.stop()
-            execution.responses.append(response)
 
+    def _accounts_and_regions(self):
         accounts_and_regions = []
         for region in self.regions:
             for account in self.accounts:
                 accounts_and_regions.append(dict(account=account, region=region))
-        thread_count = kwargs.get('thread_count', len(self.accounts))
+        return accounts_and_regions
+
+    async def _run_coroutine_payload_in_account(self, account_region_map, execution,
+            args, kwargs, executor):
+        region = account_region_map['region']
+        account = account_region_map['account']
+        loop = asyncio.get_running_loop()
+        with payload_response(region, account) as response:
+            # loading credentials may call STS, so keep it off the event loop
+            credentials = await loop.run_in_executor(executor, getattr, account, 'credentials')
+            try:
+                response.payload_output = await execution.payload(region, account, *args, **kwargs)
+            except ClientError as e:
+                if not await loop.run_in_executor(
+                        executor, refresh_expired_credentials, account, credentials, e):
+                    raise
+                response.payload_output = await execution.payload(region, account, *args, **kwargs)
+        return response
+
+    def _start_execution(self, payload):
+        if self.lazy_credentials:
+            # forget credential failures from earlier executions
+            for account in self.accounts:
+                account.set_access_role(self.access_role)
         execution = CrawlerExecution(payload)
         execution.timer.start()
-        utils.queue_threads(
-            accounts_and_regions,
-            run_payload_in_account,
-            func_args=(execution, args, kwargs),
-            thread_count=thread_count,
-        )
+        return execution
+
+    def _finish_execution(self, execution):
         execution.timer.stop()
         self.executions.append(execution)
         if execution.errors > 0:
             execution.handle_errors()
         return execution
 
+    def _process_task(self, account_region_map):
+        account = account_region_map['account']
+        return dict(
+            region=account_region_map['region'],
+            organization_id=account.organization_id,
+            master_account_id=account.master_account_id,
+            access_role=self.access_role,
+            # with lazy credentials each worker process assumes the role itself
+            credentials={} if self.lazy_credentials else account.credentials,
+            credential_cache_dir=account.credential_cache.cache_dir,
+            account=dict(
+                id=account.id,
+                name=account.name,
+                email=account.email,
+                status=account.status,
+                parent_id=account.parent_id,
+                aliases=account.aliases,
+            ),
+        )
+
+    def _iter_responses(self, execution, args, kwargs, executor):
+        '''
+        Yield ``(index, response)`` tuples as payload tasks complete, where
+        ``index`` is the task's position in ``_accounts_and_regions()``.
+        '''
+        accounts_and_regions = self._accounts_and_regions()
+        if executor == 'thread':
+            yield from utils.iter_tasks(
+                accounts_and_regions,
+                run_payload_in_account,
+                func_args=(execution, args, kwargs),
+                thread_count=min(
+                    kwargs.get('thread_count', self.thread_count),
+                    len(accounts_and_regions),
+                ),
+            )
+            return
+        results = utils.iter_tasks(
+            (self._process_task(item) for item in accounts_and_regions),
+            run_payload_in_process,
+            func_args=(execution.payload, args, kwargs),
+            thread_count=min(
+                kwargs.get('thread_count', os.cpu_count() or 1),
+                len(accounts_and_regions),
+            ),
+            executor='process',
+        )
+        for index, result in results:
+            account_region_map = accounts_and_regions[index]
+            yield index, CrawlerResponse.from_process_result(
+                account_region_map['region'], account_region_map['account'], result)
+
+    def execute(self, payload, *args, executor='thread', **kwargs):
+        '''
+        Run ``payload(region, account, *args, **kwargs)`` in all accounts and
+        regions of the crawler.  With ``executor='process'`` payloads run in
+        a pool of worker processes, one per CPU by default, which suits CPU
+        bound payloads.  The payload function, its arguments and its output
+        must then be picklable.
+        '''
+        if executor not in utils.EXECUTOR_CLASSES:
+            raise ValueError('invalid executor: {}'.format(executor))
+        execution = self._start_execution(payload)
+        responses = dict(self._iter_responses(execution, args, kwargs, executor))
+        for index in sorted(responses):
+            execution.add_response(responses[index])
+        return self._finish_execution(execution)
+
+    def execute_iter(self, payload, *args, executor='thread', keep_responses=True, **kwargs):
+        '''
+        Generator version of execute().  Yields each CrawlerResponse as soon
+        as its task completes, so responses arrive in completion order
+        rather than account and region order.  With ``keep_responses=False``
+        responses are not kept in ``execution.responses`` and memory use
+        does not grow with the number of accounts and regions.
+
+        The CrawlerExecution is appended to ``Crawler.executions`` once all
+        responses have been yielded.  Closing the generator early cancels
+        the remaining tasks.
+
+        Usage::
+
+            for response in crawler.execute_iter(payload, keep_responses=False):
+                process(response.payload_output)
+        '''
+        if executor not in utils.EXECUTOR_CLASSES:
+            raise ValueError('invalid executor: {}'.format(executor))
+        execution = self._start_execution(payload)
+        for _, response in self._iter_responses(execution, args, kwargs, executor):
+            execution.add_response(response, keep=keep_responses)
+            yield response
+        self._finish_execution(execution)
+
+    async def execute_async(self, payload, *args, concurrency=DEFAULT_ASYNC_CONCURRENCY,
+            **kwargs):
+        '''
+        Coroutine version of execute().  Coroutine payload functions are
+        awaited directly, up to ``concurrency`` at a time.  Regular payload
+        functions run in a pool of ``Crawler.thread_count`` threads.
+
+        Usage::
+
+            execution = asyncio.run(crawler.execute_async(payload))
+        '''
+        accounts_and_regions = self._accounts_and_regions()
+        execution = self._start_execution(payload)
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        is_coroutine = inspect.iscoroutinefunction(payload)
+
+        async def run_task(account_region_map, executor):
+            async with semaphore:
+                if is_coroutine:
+                    return await self._run_coroutine_payload_in_account(
+                        account_region_map, execution, args, kwargs, executor)
+                return await loop.run_in_executor(
+                    executor,
+                    run_payload_in_account,
+                    account_region_map, execution, args, kwargs,
+                )
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.thread_count) as executor:
+            responses = await asyncio.gather(
+                *[run_task(item, executor) for item in accounts_and_regions]
+            )
+        for response in responses:
+            execution.add_response(response)
+        return self._finish_execution(execution)
+
     def get_execution(self, name):
         return next((r for r in self.executions if r.name == name), None)
 
 
+def is_expired_credentials_error(error):
+    return error.response.get('Error', {}).get('Code') in utils.EXPIRED_CREDENTIALS_ERROR_CODES
+
+
+def refresh_expired_credentials(account, credentials, error):
+    '''
+    Decide whether a payload task which raised ClientError ``error`` is run
+    again.  If the error reports expired credentials, renew the account's
+    ``credentials`` and return True.  Otherwise return False.
+    '''
+    if not is_expired_credentials_error(error):
+        return False
+    account.refresh_credentials(credentials)
+    return True
+
+
+@contextlib.contextmanager
+def payload_response(region, account):
+    '''
+    Yield a timed CrawlerResponse for a payload task, recording in its
+    exc_info any exception raised by the task.
+    '''
+    response = CrawlerResponse(region, account)
+    response.timer.start()
+    try:
+        yield response
+    except Exception:
+        response.exc_info = sys.exc_info()
+    response.timer.stop()
+
+
+def run_payload_in_account(account_region_map, execution, args, kwargs):
+    region = account_region_map['region']
+    account = account_region_map['account']
+    with payload_response(region, account) as response:
+        credentials = account.credentials
+        try:
+            response.payload_output = execution.payload(region, account, *args, **kwargs)
+        except ClientError as e:
+            # credentials expired mid task: renew them and run the task again
+            if not refresh_expired_credentials(account, credentials, e):
+                raise
+            response.payload_output = execution.payload(region, account, *args, **kwargs)
+    return response
+
+
+# OrgAccount objects rebuilt in a worker process, reused by later tasks so
+# their credentials and boto3 clients are too
+_process_accounts = dict()
+
+
+def _get_process_account(task):
+    key = (task['account']['id'], task['access_role'])
+    account = _process_accounts.get(key)
+    if account is None:
+        org = orgs.Org(
+            task['master_account_id'],
+            task['access_role'],
+            credential_cache=utils.CredentialCache(cache_dir=task['credential_cache_dir']),
+        )
+        org.id = task['organization_id']
+        account = orgs.OrgAccount(org, **task['account'])
+        account.set_access_role(task['access_role'])
+        if task['credentials']:
+            account.credentials = task['credentials']
+        _process_accounts[key] = account
+    return account
+
+
+def run_payload_in_process(task, payload, args, kwargs):
+    '''
+    Run a payload task described by ``task`` in a worker process.  Returns
+    a picklable dict from which the parent process builds the response.
+    '''
+    account = _get_process_account(task)
+    response = run_payload_in_account(
+        dict(account=account, region=task['region']),
+        CrawlerExecution(payload),
+        args,
+        kwargs,
+    )
+    result = dict(
+        payload_output=response.payload_output,
+        elapsed_time=response.timer.elapsed_time,
+        error=None,
+        traceback=None,
+    )
+    if response.exc_info:
+        error = response.exc_info[1]
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(repr(error))
+        result['error'] = error
+        result['traceback'] = ''.join(traceback.format_exception(*response.exc_info))
+    return result
+
+
+class RemoteTraceback(Exception):
+    '''
+    Carries the formatted traceback of an exception raised in a worker process
+    '''
+
+    def __str__(self):
+        return self.args[0]
+
+
 class CrawlerTimer(object):
 
     def __init__(self):
@@ -182,6 +443,7 @@ class CrawlerExecution(object):
         self.errors = 0
         self.errmsg = None
         self.timer = CrawlerTimer()
+        self._first_error = None
 
     def dump(self):
         return dict(
@@ -191,10 +453,20 @@ class CrawlerExecution(object):
             statistics=self.timer.dump()
         )
 
+    def add_response(self, response, keep=True):
+        '''
+        Count a completed CrawlerResponse, and keep it in ``responses``
+        unless ``keep`` is False.
+        '''
+        if response.exc_info:
+            self.errors += 1
+            if self._first_error is None:
+                self._first_error = response
+        if keep:
+            self.responses.append(response)
+
     def handle_errors(self):
-        exc_info = next(
-            (response for response in self.responses if response.exc_info)
-        ).exc_info
+        exc_info = self._first_error.exc_info
         self.errmsg = (
             'OrgCrawler.execute encountered {} exceptions while running payload function "{}". '
             '\n\nExample traceback:'.format(
@@ -216,6 +488,17 @@ class CrawlerResponse(object):
         self.timer = CrawlerTimer()
         self.exc_info = None
 
+    @classmethod
+    def from_process_result(cls, region, account, result):
+        response = cls(region, account)
+        response.payload_output = result['payload_output']
+        response.timer.elapsed_time = result['elapsed_time']
+        error = result['error']
+        if error is not None:
+            error.__cause__ = RemoteTraceback(result['traceback'])
+            response.exc_info = (type(error), error, None)
+        return response
+
     def dump(self):
         return dict(
             region=self.region,
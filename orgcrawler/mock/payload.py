@@ -1,6 +1,3 @@
-import boto3
-
-
 args_dict = dict(
     arg1='cat',
     arg2='dog',
@@ -28,19 +25,19 @@ all_args = dict(
 
 
 def set_mock_account_alias(region, account):
-    client = boto3.client('iam', region_name=region, **account.credentials)
+    client = account.get_client('iam', region)
     client.create_account_alias(AccountAlias='alias-' + account.name)
     return
 
 
 def get_mock_account_alias(region, account):
-    client = boto3.client('iam', region_name=region, **account.credentials)
+    client = account.get_client('iam', region)
     response = client.list_account_aliases()
     return response['AccountAliases']
 
 
 def create_mock_bucket(region, account, bucket_prefix):
-    client = boto3.client('s3', region_name=region, **account.credentials)
+    client = account.get_client('s3', region)
     response = client.create_bucket(
         Bucket='-'.join([bucket_prefix, account.id, region]),
         CreateBucketConfiguration={'LocationConstraint': region},
@@ -49,7 +46,7 @@ def create_mock_bucket(region, account, bucket_prefix):
 
 
 def bad_payload_func(region, account):
-    client = boto3.client('ec2', region_name=region, **account.credentials)
+    client = account.get_client('ec2', region)
     response = client.create_instance(BadParam='bogus')
     return response  # pragma: no cover
 
@@ -1,12 +1,15 @@
 import os
 import sys
 import shutil
+import tempfile
+import threading
+import time
 import inspect
-import pickle
+import hashlib
 import json
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
-import boto3
 import botocore
 from botocore.exceptions import ClientError
 
@@ -14,6 +17,16 @@ from orgcrawler import utils
 from orgcrawler.logger import Logger
 
 
+CACHE_FORMAT = 'orgcrawler-cache'
+CACHE_SCHEMA_VERSION = 1
+ACCOUNT_CLIENT_CACHE_SIZE = 32
+ORG_CLIENT_CONFIG = botocore.config.Config(
+    # see https://github.com/boto/botocore/issues/619
+    # the default is 10
+    max_pool_connections=10
+)
+
+
 class Org(object):
     """
     Data model and methods for querying AWS Organizations resources.
@@ -38,6 +51,19 @@ class Org(object):
             [Default: ``~/.aws/orgcrawler-cache``].
         cache_file (str): Cache file name
             [Default: ``cache_file-${master_account_id}``].
+        cache_file_max_stale_age (int): If set, a cache file older than
+            ``cache_file_max_age`` but not older than this many minutes is
+            loaded at once, and the cache file is refreshed in a background
+            thread [Default: None].
+        rate_limiter (:obj:`utils.RateLimiter`): Rate limiter for all
+            Organizations API requests made by this Org object
+            [Default: a new RateLimiter].
+        retry_policy (:obj:`utils.RetryPolicy`): Retry policy for throttled
+            and failed Organizations API requests
+            [Default: ``utils.DEFAULT_RETRY_POLICY``].
+        credential_cache (:obj:`utils.CredentialCache`): Cache for assumed
+            role credentials of the master account and of OrgAccount objects
+            [Default: ``utils.credential_cache``].
 
     Object Attributes and Methods:
 
@@ -52,6 +78,15 @@ class Org(object):
             units in the Organization.
         policies list(:obj:`OrgPolicy`)): List of Service Control Policies in
             the Organization.
+        rate_limiter (:obj:`utils.RateLimiter`): Rate limiter shared by all
+            Organizations API requests made while loading.
+        retry_policy (:obj:`utils.RetryPolicy`): Retry policy for
+            Organizations API requests made while loading.
+        credential_cache (:obj:`utils.CredentialCache`): Cache for assumed
+            role credentials.
+        load_stats (:obj:`utils.ApiStats`): Per-operation counts and
+            latencies of the Organizations API requests made by the last
+            load from the API.  Empty if loaded from cache.
 
     """
 
@@ -61,22 +96,37 @@ class Org(object):
             log_level=utils.DEFAULT_LOGLEVEL,
             cache_file_max_age=60,
             cache_dir='~/.aws/orgcrawler-cache',
-            cache_file=None):
+            cache_file=None,
+            cache_file_max_stale_age=None,
+            rate_limiter=None,
+            retry_policy=None,
+            credential_cache=None):
         self.master_account_id = master_account_id
         self.access_role = org_access_role
         self.logger = Logger(loglevel=log_level)
+        self._log_level = log_level
         self.id = None
         self.root_id = None
         self.accounts = []
         self.org_units = []
         self.policies = []
         self.client = None
+        self.rate_limiter = rate_limiter or utils.RateLimiter()
+        self.retry_policy = retry_policy or utils.DEFAULT_RETRY_POLICY
+        if credential_cache is None:
+            credential_cache = utils.credential_cache
+        self.credential_cache = credential_cache
+        self.load_stats = utils.ApiStats()
         self._cache_file_max_age = cache_file_max_age
+        self._cache_file_max_stale_age = cache_file_max_stale_age
         self._cache_dir = os.path.expanduser(cache_dir)
         if cache_file is None:
             cache_file = '-'.join(['cache_file', master_account_id])
         self._cache_file = os.path.join(self._cache_dir, cache_file)
-        self._exc_info = None
+        self._cache_lock_file = self._cache_file + '.lock'
+        self._refresh_thread = None
+        self._account_parent_ids = dict()
+        self._build_indexes()
 
     def dump_accounts(self, account_list=None):
         """
@@ -102,13 +152,15 @@ class Org(object):
         """
         Dump loaded Org object as dictionary
         """
-        org_dump = dict()
-        org_dump.update(vars(self).items())
+        org_dump = dict(
+            (key, value) for key, value in vars(self).items() if not key.startswith('_')
+        )
         org_dump.pop('logger')
         org_dump.pop('client')
-        org_dump.pop('_cache_dir')
-        org_dump.pop('_cache_file')
-        org_dump.pop('_cache_file_max_age')
+        org_dump.pop('rate_limiter')
+        org_dump.pop('retry_policy')
+        org_dump.pop('credential_cache')
+        org_dump.pop('load_stats')
         org_dump['accounts'] = self.dump_accounts()
         org_dump['org_units'] = self.dump_org_units()
         org_dump['policies'] = self.dump_policies()
@@ -120,10 +172,16 @@ class Org(object):
         """
         return json.dumps(self.dump(), indent=4, separators=(',', ': '))
 
-    def load(self):
+    def load(self, incremental=False):
         """
         Make boto3 client calls to populate the Org object's Account and
         OrganizationalUnit resource data
+
+        Args:
+            incremental (bool): Accepted for compatibility and ignored.  An
+                expired cache file is always replaced by a full reload, which
+                makes one list_targets_for_policy call per policy and none
+                per account [Default: False].
         """
         message = {
             'FILE': __file__.split('/')[-1],
@@ -134,16 +192,97 @@ class Org(object):
         self._load_client()
         try:
             org_dump = self._get_cached_org_from_file()
-            self._load_org_dump(org_dump)
         except RuntimeError:
-            self._load_org()
-            self.accounts = []
-            self._load_accounts()
-            self.org_units = []
-            self._load_org_units()
-            self.policies = []
-            self._load_policies()
-            self._save_cached_org_to_file()
+            org_dump = self._get_stale_org_dump()
+            if org_dump is not None:
+                self._refresh_thread = threading.Thread(target=self._refresh_cache_file)
+                self._refresh_thread.start()
+                self._load_org_dump(org_dump)
+                return
+            with self._lock_cache():
+                try:
+                    # another process may have reloaded while we waited
+                    org_dump = self._get_cached_org_from_file()
+                except RuntimeError:
+                    self._load_org_from_api()
+                    return
+        self._load_org_dump(org_dump)
+
+    def refresh(self):
+        """
+        Reload the Org object from the API regardless of the age of the
+        cache file, and save the result to the cache file.
+        """
+        message = {
+            'FILE': __file__.split('/')[-1],
+            'CLASS': self.__class__.__name__,
+            'METHOD': inspect.stack()[0][3],
+        }
+        self.logger.info(message)
+        if self.client is None:
+            self._load_client()
+        with self._lock_cache():
+            self._load_org_from_api()
+
+    def wait_for_refresh(self, timeout=None):
+        """
+        Wait for a background cache file refresh started by ``load()`` to
+        finish.  See ``cache_file_max_stale_age``.
+
+        Args:
+            timeout (float): seconds to wait [Default: wait indefinitely]
+        Returns:
+            bool: True if no refresh is running
+        """
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+            return not self._refresh_thread.is_alive()
+        return True
+
+    def _get_stale_org_dump(self):
+        """
+        Return the contents of an expired cache file, or None if stale cache
+        files are not in use, or the cache file is missing, unreadable or
+        older than ``cache_file_max_stale_age``.
+        """
+        if self._cache_file_max_stale_age is None:
+            return None
+        try:
+            cache_file_mod_time = datetime.fromtimestamp(os.stat(self._cache_file).st_mtime)
+            if datetime.today() - cache_file_mod_time > timedelta(
+                    minutes=self._cache_file_max_stale_age):
+                return None
+            return self._get_cached_org_from_file(check_age=False)
+        except (OSError, RuntimeError):
+            return None
+
+    def _refresh_cache_file(self):
+        """
+        Reload the Org into the cache file using a separate Org object, so
+        the loaded Org object is left unchanged.  Runs in a background thread.
+        """
+        message = {
+            'FILE': __file__.split('/')[-1],
+            'CLASS': self.__class__.__name__,
+            'METHOD': inspect.stack()[0][3],
+        }
+        self.logger.info(message)
+        org = Org(
+            self.master_account_id,
+            self.access_role,
+            log_level=self._log_level,
+            cache_file_max_age=self._cache_file_max_age,
+            cache_dir=self._cache_dir,
+            cache_file=os.path.basename(self._cache_file),
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            credential_cache=self.credential_cache,
+        )
+        try:
+            org.load()
+        except Exception as e:   # pragma: no cover
+            message['error'] = 'background cache refresh failed: {}'.format(e)
+            self.logger.error(message)
 
     def clear_cache(self):
         '''
@@ -152,6 +291,20 @@ class Org(object):
         if os.path.isdir(self._cache_dir):
             shutil.rmtree(self._cache_dir)
 
+    def _lock_cache(self):
+        """
+        Return a context manager holding an advisory lock on the cache file,
+        so that concurrent processes do not reload the same Org at once.
+        """
+        message = {
+            'FILE': __file__.split('/')[-1],
+            'CLASS': self.__class__.__name__,
+            'METHOD': inspect.stack()[0][3],
+        }
+        self.logger.info(message)
+        os.makedirs(self._cache_dir, 0o700, exist_ok=True)
+        return utils.file_lock(self._cache_lock_file)
+
     def _load_client(self):
         message = {
             'FILE': __file__.split('/')[-1],
@@ -173,6 +326,7 @@ class Org(object):
             credentials = utils.assume_role_in_account(
                 self.master_account_id,
                 self.access_role,
+                cache=self.credential_cache,
             )
         except ClientError as e:    # pragma: no cover
             errmsg = 'cannot assume role {} in account {}: {}'.format(
@@ -181,14 +335,13 @@ class Org(object):
                 e.response['Error']['Code'],
             )
             sys.exit(errmsg)
-        client_config = botocore.config.Config(
-            # see https://github.com/boto/botocore/issues/619
-            # the default is 10
-            max_pool_connections=10
+        return utils.get_client(
+            'organizations',
+            credentials=credentials,
+            config=ORG_CLIENT_CONFIG,
         )
-        return boto3.client('organizations', config=client_config, **credentials)
 
-    def _get_cached_org_from_file(self):
+    def _get_cached_org_from_file(self, check_age=True):
         message = {
             'FILE': __file__.split('/')[-1],
             'CLASS': self.__class__.__name__,
@@ -200,10 +353,10 @@ class Org(object):
         cache_file_mod_time = datetime.fromtimestamp(os.stat(self._cache_file).st_mtime)
         now = datetime.today()
         max_delay = timedelta(minutes=self._cache_file_max_age)
-        if now - cache_file_mod_time > max_delay:
+        if check_age and now - cache_file_mod_time > max_delay:
             raise RuntimeError('Cache file too old')
-        with open(self._cache_file, 'rb') as pf:
-            return pickle.load(pf)
+        with open(self._cache_file, 'rb') as cf:
+            return self._decode_cache(cf.read())
 
     def _load_org_dump(self, org_dump):
         message = {
@@ -223,6 +376,52 @@ class Org(object):
         self.policies = [
             OrgPolicy(self, **policy) for policy in org_dump['policies']
         ]
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """
+        Build lookup tables mapping resource id, name and alias to the loaded
+        OrgAccount, OrganizationalUnit and OrgPolicy objects, and parent id
+        to child accounts and org_units.  Must be rerun whenever the accounts,
+        org_units or policies lists are replaced.  Where names collide the
+        first object in list order wins, same as a linear search would.
+        """
+        self._accounts_by_id = dict()
+        self._accounts_by_name = dict()
+        self._accounts_by_alias = dict()
+        self._accounts_by_parent = dict()
+        for account in self.accounts:
+            self._accounts_by_id.setdefault(account.id, account)
+            self._accounts_by_name.setdefault(account.name, account)
+            for alias in account.aliases:
+                self._accounts_by_alias.setdefault(alias, account)
+            self._accounts_by_parent.setdefault(account.parent_id, []).append(account)
+        self._org_units_by_id = dict()
+        self._org_units_by_name = dict()
+        self._org_units_by_parent = dict()
+        for org_unit in self.org_units:
+            self._org_units_by_id.setdefault(org_unit.id, org_unit)
+            self._org_units_by_name.setdefault(org_unit.name, org_unit)
+            self._org_units_by_parent.setdefault(org_unit.parent_id, []).append(org_unit)
+        self._policies_by_id = dict()
+        self._policies_by_name = dict()
+        for policy in self.policies:
+            self._policies_by_id.setdefault(policy.id, policy)
+            self._policies_by_name.setdefault(policy.name, policy)
+
+    @staticmethod
+    def _lookup(identifier, *indexes):
+        """
+        Return the first object found under ``identifier`` in ``indexes``.
+        Unhashable identifiers match nothing.
+        """
+        for index in indexes:
+            try:
+                if identifier in index:
+                    return index[identifier]
+            except TypeError:
+                return None
+        return None
 
     def _load_org(self):
         message = {
@@ -231,9 +430,43 @@ class Org(object):
             'METHOD': inspect.stack()[0][3],
         }
         self.logger.info(message)
-        response = self.client.describe_organization()
+        response = next(utils.paginate(
+            self.client.describe_organization,
+            retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter,
+            logger=self.logger,
+            stats=self.load_stats,
+        ))
         self.id = response['Organization']['Id']
-        self.root_id = self.client.list_roots()['Roots'][0]['Id']
+        roots = utils.handle_nexttoken_and_retries(
+            obj=self,
+            collector_key='Roots',
+            function=self.client.list_roots,
+        )
+        self.root_id = roots[0]['Id']
+
+    def _load_org_from_api(self):
+        """
+        Populate the Org object from boto3 client calls and save the result to
+        the cache file.
+        """
+        message = {
+            'FILE': __file__.split('/')[-1],
+            'CLASS': self.__class__.__name__,
+            'METHOD': inspect.stack()[0][3],
+        }
+        self.logger.info(message)
+        self.load_stats.reset()
+        self._load_org()
+        self.org_units = []
+        self._load_org_units()
+        self.accounts = []
+        self._load_accounts()
+        self.policies = []
+        self._load_policies()
+        self._load_attached_policy_ids()
+        self._build_indexes()
+        self._save_cached_org_to_file()
 
     def _load_accounts(self):
         message = {
@@ -242,13 +475,17 @@ class Org(object):
             'METHOD': inspect.stack()[0][3],
         }
         self.logger.info(message)
-        accounts = utils.handle_nexttoken_and_retries(
-            obj=self,
-            collector_key='Accounts',
-            function=self.client.list_accounts,
+        # accounts are processed while later pages are still being listed
+        accounts = utils.paginate(
+            self.client.list_accounts,
+            'Accounts',
+            retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter,
+            logger=self.logger,
+            stats=self.load_stats,
         )
         # skip accounts with no 'Name' key, as these are not fully created yet.
-        accounts = [account for account in accounts if 'Name' in account]
+        accounts = (account for account in accounts if 'Name' in account)
 
         def make_org_account_object(account, org):
             message = {
@@ -259,28 +496,24 @@ class Org(object):
                 'account_name': account['Name'],
             }
             self.logger.info(message)
-            try:
-                org_account = OrgAccount(
-                    org,
-                    name=account['Name'],
-                    id=account['Id'],
-                    email=account['Email'],
-                    status=account['Status'],
-                )
+            org_account = OrgAccount(
+                org,
+                name=account['Name'],
+                id=account['Id'],
+                email=account['Email'],
+                status=account['Status'],
+                parent_id=org._account_parent_ids.get(account['Id']),
+            )
+            if org_account.parent_id is None:
                 org_account.get_parent_id()
-                org_account.load_attached_policy_ids()
-                org.accounts.append(org_account)
-            except Exception:   # pragma: no cover
-                org._exc_info = sys.exc_info()
+            return org_account
 
-        utils.queue_threads(
+        self.accounts.extend(utils.run_tasks(
             accounts,
             make_org_account_object,
             func_args=(self,),
             logger=self.logger,
-        )
-        if self._exc_info:   # pragma: no cover
-            raise self._exc_info[1].with_traceback(self._exc_info[2])
+        ))
 
     def _load_org_units(self):
         message = {
@@ -289,31 +522,76 @@ class Org(object):
             'METHOD': inspect.stack()[0][3],
         }
         self.logger.info(message)
-        self._recurse_organization(self.root_id)
+        self._account_parent_ids = dict()
+        children = dict()
+        level = [self.root_id]
+        while level:
+            children.update(self._load_org_units_for_parents(level))
+            level = [ou.id for parent_id in level for ou in children[parent_id]]
+        # flatten the tree depth first so org_units keeps its traditional order
+        stack = list(reversed(children[self.root_id]))
+        while stack:
+            org_unit = stack.pop()
+            self.org_units.append(org_unit)
+            stack.extend(reversed(children[org_unit.id]))
 
-    def _recurse_organization(self, parent_id):
+    def _load_org_units_for_parents(self, parent_ids):
+        """
+        Query the child org_units of one level of the organization tree in
+        parallel.  Returns a dict mapping each parent id to a list of its
+        child OrganizationalUnit objects.  Child account ids are recorded in
+        ``_account_parent_ids`` so ``_load_accounts`` need not look up each
+        account's parent separately.
+        """
         message = {
             'FILE': __file__.split('/')[-1],
             'CLASS': self.__class__.__name__,
             'METHOD': inspect.stack()[0][3],
+            'parent_ids': parent_ids,
         }
         self.logger.info(message)
-        org_units = utils.handle_nexttoken_and_retries(
-            obj=self,
-            collector_key='OrganizationalUnits',
-            function=self.client.list_organizational_units_for_parent,
-            kwargs=dict(ParentId=parent_id),
-        )
-        for ou in org_units:
-            org_unit = OrganizationalUnit(
-                self,
-                name=ou['Name'],
-                id=ou['Id'],
-                parent_id=parent_id,
+        children = dict()
+
+        def make_org_unit_objects(parent_id, org):
+            message = {
+                'FILE': __file__.split('/')[-1],
+                'CLASS': self.__class__.__name__,
+                'METHOD': inspect.stack()[0][3],
+                'parent_id': parent_id,
+            }
+            self.logger.info(message)
+            org_units = utils.handle_nexttoken_and_retries(
+                obj=org,
+                collector_key='OrganizationalUnits',
+                function=org.client.list_organizational_units_for_parent,
+                kwargs=dict(ParentId=parent_id),
             )
-            org_unit.load_attached_policy_ids()
-            self.org_units.append(org_unit)
-            self._recurse_organization(ou['Id'])
+            collector = []
+            for ou in org_units:
+                org_unit = OrganizationalUnit(
+                    org,
+                    name=ou['Name'],
+                    id=ou['Id'],
+                    parent_id=parent_id,
+                )
+                collector.append(org_unit)
+            children[parent_id] = collector
+            accounts = utils.handle_nexttoken_and_retries(
+                obj=org,
+                collector_key='Accounts',
+                function=org.client.list_accounts_for_parent,
+                kwargs=dict(ParentId=parent_id),
+            )
+            for account in accounts:
+                org._account_parent_ids[account['Id']] = parent_id
+
+        utils.run_tasks(
+            parent_ids,
+            make_org_unit_objects,
+            func_args=(self,),
+            logger=self.logger,
+        )
+        return children
 
     def _load_policies(self):
         message = {
@@ -337,25 +615,40 @@ class Org(object):
                 'policy': policy,
             }
             self.logger.info(message)
-            try:
-                org_policy = OrgPolicy(
-                    org,
-                    name=policy['Name'],
-                    id=policy['Id'],
-                )
-                org_policy.load_targets()
-                org.policies.append(org_policy)
-            except Exception:   # pragma: no cover
-                org._exc_info = sys.exc_info()
+            org_policy = OrgPolicy(
+                org,
+                name=policy['Name'],
+                id=policy['Id'],
+            )
+            org_policy.load_targets()
+            return org_policy
 
-        utils.queue_threads(
+        # results keep the order returned by list_policies
+        self.policies.extend(utils.run_tasks(
             policies,
             make_org_policy_object,
             func_args=(self,),
             logger=self.logger,
-        )
-        if self._exc_info:   # pragma: no cover
-            raise self._exc_info[1].with_traceback(self._exc_info[2])
+        ))
+
+    def _load_attached_policy_ids(self):
+        """
+        Set attached_policy_ids for all accounts and org_units by inverting
+        the policy targets collected in ``_load_policies``.  This replaces a
+        list_policies_for_target call per account and org_unit.
+        """
+        message = {
+            'FILE': __file__.split('/')[-1],
+            'CLASS': self.__class__.__name__,
+            'METHOD': inspect.stack()[0][3],
+        }
+        self.logger.info(message)
+        policy_ids_by_target = dict()
+        for policy in self.policies:
+            for target in policy.targets:
+                policy_ids_by_target.setdefault(target['TargetId'], []).append(policy.id)
+        for org_object in self.accounts + self.org_units:
+            org_object.attached_policy_ids = policy_ids_by_target.get(org_object.id, [])
 
     def _save_cached_org_to_file(self):
         message = {
@@ -365,8 +658,175 @@ class Org(object):
         }
         self.logger.info(message)
         os.makedirs(self._cache_dir, 0o700, exist_ok=True)
-        with open(self._cache_file, 'wb') as pf:
-            pickle.dump(self.dump(), pf)
+        # write to a temp file and rename, so readers never see a partial file
+        fd, temp_file = tempfile.mkstemp(
+            dir=self._cache_dir,
+            prefix=os.path.basename(self._cache_file) + '.',
+        )
+        try:
+            with os.fdopen(fd, 'wb') as cf:
+                cf.write(self._encode_cache(self.dump()))
+            os.replace(temp_file, self._cache_file)
+        except BaseException:
+            os.remove(temp_file)
+            raise
+
+    @staticmethod
+    def _encode_cache(org_dump):
+        """
+        Serialize an Org dump into cache file format: a json header line
+        holding schema version, creation time and sha256 of the body, then
+        a compact json body.
+
+        In the body all ids and names are interned in a string table.
+        Distinct attached policy id lists and distinct policy targets are
+        likewise stored once and referenced by index.  Resource records are
+        lists in the field order listed below.  Attributes common to all
+        resources are stored once.
+        """
+        tables = dict(strings=[None], policy_id_lists=[None], targets=[])
+        indexes = dict(strings={None: 0}, policy_id_lists={None: 0}, targets=dict())
+
+        def intern(table, value):
+            if value not in indexes[table]:
+                indexes[table][value] = len(tables[table])
+                tables[table].append(value)
+            return indexes[table][value]
+
+        def intern_string(value):
+            return intern('strings', value)
+
+        def intern_policy_ids(policy_ids):
+            if policy_ids is not None:
+                policy_ids = tuple(intern_string(policy_id) for policy_id in policy_ids)
+            return intern('policy_id_lists', policy_ids)
+
+        def intern_target(target):
+            return intern('targets', (
+                intern_string(target['TargetId']),
+                intern_string(target['Name']),
+                intern_string(target['Type']),
+                intern_string(target['Arn']),
+            ))
+
+        body = dict(
+            master_account_id=org_dump['master_account_id'],
+            access_role=org_dump['access_role'],
+            id=org_dump['id'],
+            root_id=intern_string(org_dump['root_id']),
+            # [id, name, parent_id, attached_policy_ids, email, status, aliases]
+            accounts=[[
+                intern_string(a['id']),
+                intern_string(a['name']),
+                intern_string(a['parent_id']),
+                intern_policy_ids(a['attached_policy_ids']),
+                a['email'],
+                a['status'],
+                [intern_string(alias) for alias in a['aliases']],
+            ] for a in org_dump['accounts']],
+            # [id, name, parent_id, attached_policy_ids]
+            org_units=[[
+                intern_string(ou['id']),
+                intern_string(ou['name']),
+                intern_string(ou['parent_id']),
+                intern_policy_ids(ou['attached_policy_ids']),
+            ] for ou in org_dump['org_units']],
+            # [id, name, targets]
+            policies=[[
+                intern_string(p['id']),
+                intern_string(p['name']),
+                [intern_target(t) for t in p['targets']],
+            ] for p in org_dump['policies']],
+        )
+        # [target_id, target_name, target_type, target_arn]
+        body['targets'] = tables['targets']
+        body['policy_id_lists'] = tables['policy_id_lists']
+        body['strings'] = tables['strings']
+        body = json.dumps(body, separators=(',', ':')).encode()
+        header = dict(
+            format=CACHE_FORMAT,
+            schema_version=CACHE_SCHEMA_VERSION,
+            created=datetime.utcnow().isoformat(),
+            sha256=hashlib.sha256(body).hexdigest(),
+        )
+        return json.dumps(header).encode() + b'\n' + body
+
+    @staticmethod
+    def _decode_cache(data):
+        """
+        Return the Org dump from cache file contents produced by
+        ``_encode_cache``.  Raise RuntimeError if the contents are not in the
+        current cache file format.
+        """
+        header, _, body = data.partition(b'\n')
+        try:
+            header = json.loads(header.decode())
+            cache_format = header['format']
+            schema_version = header['schema_version']
+            checksum = header['sha256']
+        except (ValueError, TypeError, KeyError):
+            raise RuntimeError('Cache file format not recognized')
+        if cache_format != CACHE_FORMAT or schema_version != CACHE_SCHEMA_VERSION:
+            raise RuntimeError('Cache file version mismatch')
+        if hashlib.sha256(body).hexdigest() != checksum:
+            raise RuntimeError('Cache file checksum mismatch')
+        body = json.loads(body.decode())
+        s = body['strings']
+        policy_id_lists = [
+            None if indexes is None else [s[i] for i in indexes]
+            for indexes in body['policy_id_lists']
+        ]
+        targets = [
+            {'TargetId': s[t_id], 'Name': s[t_name], 'Type': s[t_type], 'Arn': s[t_arn]}
+            for t_id, t_name, t_type, t_arn in body['targets']
+        ]
+
+        def copy(value):
+            if value is None:
+                return None
+            return value[:]
+
+        org_id = body['id']
+        master_account_id = body['master_account_id']
+        accounts = [{
+            'organization_id': org_id,
+            'master_account_id': master_account_id,
+            'id': s[account_id],
+            'name': s[name],
+            'parent_id': s[parent_id],
+            'attached_policy_ids': copy(policy_id_lists[policy_ids]),
+            'email': email,
+            'status': status,
+            'aliases': [s[i] for i in aliases],
+            'credentials': {},
+        } for account_id, name, parent_id, policy_ids, email, status, aliases
+            in body['accounts']]
+        org_units = [{
+            'organization_id': org_id,
+            'master_account_id': master_account_id,
+            'id': s[ou_id],
+            'name': s[name],
+            'parent_id': s[parent_id],
+            'attached_policy_ids': copy(policy_id_lists[policy_ids]),
+        } for ou_id, name, parent_id, policy_ids in body['org_units']]
+        policies = [{
+            'organization_id': org_id,
+            'master_account_id': master_account_id,
+            'id': s[policy_id],
+            'name': s[name],
+            'parent_id': None,
+            'attached_policy_ids': None,
+            'targets': [targets[i] for i in target_indexes],
+        } for policy_id, name, target_indexes in body['policies']]
+        return dict(
+            master_account_id=master_account_id,
+            access_role=body['access_role'],
+            id=org_id,
+            root_id=s[body['root_id']],
+            accounts=accounts,
+            org_units=org_units,
+            policies=policies,
+        )
 
     # Query methods
 
@@ -399,7 +859,10 @@ class Org(object):
         Returns:
             str: account Id matching ``name``
         """
-        return next((a.id for a in self.accounts if a.name == name), None)
+        account = self._lookup(name, self._accounts_by_name)
+        if account is not None:
+            return account.id
+        return None
 
     def get_account_name_by_id(self, account_id):
         """
@@ -408,7 +871,10 @@ class Org(object):
         Returns:
             str: account name matching ``id``
         """
-        return next((a.name for a in self.accounts if a.id == account_id), None)
+        account = self._lookup(account_id, self._accounts_by_id)
+        if account is not None:
+            return account.name
+        return None
 
     def get_account(self, identifier):
         """
@@ -419,10 +885,12 @@ class Org(object):
         """
         if isinstance(identifier, OrgAccount):
             return identifier
-        return next((
-            a for a in self.accounts
-            if (identifier == a.name or identifier == a.id or identifier in a.aliases)
-        ), None)
+        return self._lookup(
+            identifier,
+            self._accounts_by_id,
+            self._accounts_by_name,
+            self._accounts_by_alias,
+        )
 
     def list_org_units_by_name(self, ou_list=None):
         """
@@ -455,10 +923,7 @@ class Org(object):
         """
         if isinstance(identifier, OrganizationalUnit):
             return identifier
-        return next((
-            org_unit for org_unit in self.org_units
-            if (identifier == org_unit.name or identifier == org_unit.id)
-        ), None)
+        return self._lookup(identifier, self._org_units_by_id, self._org_units_by_name)
 
     def get_org_unit_id(self, identifier):
         """
@@ -483,7 +948,7 @@ class Org(object):
             list(OrganizationalUnit): org_units for which ``ou`` is a direct parent
         """
         ou_id = self.get_org_unit_id(ou)
-        return [ou for ou in self.org_units if ou.parent_id == ou_id]
+        return list(self._org_units_by_parent.get(ou_id, []))
 
     def list_accounts_in_ou(self, ou):
         """
@@ -493,18 +958,19 @@ class Org(object):
             list(OrgAccount): accounts for which ``ou`` is a direct parent
         """
         ou_id = self.get_org_unit_id(ou)
-        return [a for a in self.accounts if a.parent_id == ou_id]
+        return list(self._accounts_by_parent.get(ou_id, []))
 
     def list_org_units_in_ou_recursive(self, ou):
         """
         Args:
             ou (str, OrganizationalUnit): org_unit name, id or object
         Returns:
-            list(OrganizationalUnit): org_units for which ``ou`` is an ancestor
+            list(OrganizationalUnit): org_units for which ``ou`` is an ancestor,
+            in breadth first order
         """
         ou_list = self.list_org_units_in_ou(ou)
-        for ou in ou_list:
-            ou_list += self.list_org_units_in_ou_recursive(ou)
+        for org_unit in ou_list:
+            ou_list.extend(self._org_units_by_parent.get(org_unit.id, []))
         return ou_list
 
     def list_accounts_in_ou_recursive(self, ou):
@@ -515,8 +981,8 @@ class Org(object):
             list(OrgAccount): accounts for which ``ou`` is an ancestor
         """
         account_list = self.list_accounts_in_ou(ou)
-        for ou in self.list_org_units_in_ou_recursive(ou):
-            account_list += self.list_accounts_in_ou(ou)
+        for org_unit in self.list_org_units_in_ou_recursive(ou):
+            account_list.extend(self._accounts_by_parent.get(org_unit.id, []))
         return account_list
 
     def list_policies_by_name(self, policy_list=None):
@@ -550,10 +1016,7 @@ class Org(object):
         """
         if isinstance(identifier, OrgPolicy):
             return identifier
-        return next((
-            p for p in self.policies
-            if (identifier == p.name or identifier == p.id)
-        ), None)
+        return self._lookup(identifier, self._policies_by_id, self._policies_by_name)
 
     def get_policy_id(self, identifier):
         """
@@ -574,7 +1037,10 @@ class Org(object):
         Returns:
             str: policy Id matching ``name``
         """
-        return next((p.id for p in self.policies if p.name == name), None)
+        policy = self._lookup(name, self._policies_by_name)
+        if policy is not None:
+            return policy.id
+        return None
 
     def get_policy_name_by_id(self, policy_id):
         """
@@ -583,7 +1049,10 @@ class Org(object):
         Returns:
             str: policy name matching ``id``
         """
-        return next((p.name for p in self.policies if p.id == policy_id), None)
+        policy = self._lookup(policy_id, self._policies_by_id)
+        if policy is not None:
+            return policy.name
+        return None
 
     '''
     def get_policy_document(self, identifier):
@@ -661,6 +1130,10 @@ class OrgObject(object):
         self.master_account_id = organization.master_account_id
         self.client = organization.client
         self.logger = organization.logger
+        self.rate_limiter = organization.rate_limiter
+        self.retry_policy = organization.retry_policy
+        self.credential_cache = organization.credential_cache
+        self.load_stats = organization.load_stats
         self.name = kwargs['name']
         self.id = kwargs.get('id')
         self.parent_id = kwargs.get('parent_id')
@@ -670,10 +1143,15 @@ class OrgObject(object):
         """
         Return object as dict
         """
-        org_object_dump = dict()
-        org_object_dump.update(vars(self).items())
+        org_object_dump = dict(
+            (key, value) for key, value in vars(self).items() if not key.startswith('_')
+        )
         org_object_dump.pop('logger')
         org_object_dump.pop('client')
+        org_object_dump.pop('rate_limiter')
+        org_object_dump.pop('retry_policy')
+        org_object_dump.pop('credential_cache')
+        org_object_dump.pop('load_stats')
         return org_object_dump
 
     def get_parent_id(self):
@@ -732,11 +1210,148 @@ class OrgAccount(OrgObject):
         self.email = kwargs['email']
         self.aliases = kwargs.get('aliases', [])
         self.status = kwargs['status']
-        self.credentials = {}
+        self._credentials = {}
+        self._credentials_expiration = None
+        self._credentials_error = None
+        self._access_role = None
+        self._credentials_lock = threading.Lock()
+        self._clients = OrderedDict()
+        self._clients_lock = threading.Lock()
+        self._clients_credentials = None
+        self._local = threading.local()
+
+    @property
+    def credentials(self):
+        '''
+        Credentials for boto3 clients in this account.  If an access role was
+        set with ``set_access_role()``, they are loaded on first use.
+        Concurrent first uses wait for a single AssumeRole call.  If that
+        call fails, later uses raise the same exception without calling
+        AssumeRole again, until ``set_access_role()`` is called.
+
+        Credentials are renewed on use once they are within the credential
+        cache refresh margin of their expiration.  One thread renews them
+        while others keep using the current credentials until they expire.
+        '''
+        if not self._credentials and self._access_role is not None:
+            with self._credentials_lock:
+                if self._credentials_error is not None:
+                    raise self._credentials_error
+                if not self._credentials:
+                    try:
+                        self.load_credentials(self._access_role)
+                    except Exception as e:
+                        self._credentials_error = e
+                        raise
+        elif self._credentials_expiring():
+            expired = time.time() >= self._credentials_expiration
+            if self._credentials_lock.acquire(blocking=expired):
+                try:
+                    if self._credentials_expiring():
+                        self.load_credentials(self._access_role)
+                finally:
+                    self._credentials_lock.release()
+        return self._credentials
+
+    @credentials.setter
+    def credentials(self, credentials):
+        self._credentials = credentials
+        with self._clients_lock:
+            self._clients.clear()
+
+    def get_client(self, service_name, region_name=None):
+        '''
+        Return a boto3 client for ``service_name`` in ``region_name`` using
+        the account credentials.  Clients are thread safe and are shared by
+        all threads.  Up to ACCOUNT_CLIENT_CACHE_SIZE are kept per account,
+        until the credentials change.
+        '''
+        credentials = self.credentials
+        key = (service_name, region_name)
+        with self._clients_lock:
+            if self._clients_credentials is not credentials:
+                self._clients.clear()
+                self._clients_credentials = credentials
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+        client = utils.get_thread_session().client(
+            service_name,
+            region_name=region_name,
+            **credentials
+        )
+        with self._clients_lock:
+            if self._clients_credentials is not credentials:   # pragma: no cover
+                # credentials changed while the client was created
+                return client
+            client = self._clients.setdefault(key, client)
+            while len(self._clients) > ACCOUNT_CLIENT_CACHE_SIZE:
+                self._clients.popitem(last=False)
+        return client
+
+    def get_resource(self, service_name, region_name=None):
+        '''
+        Return a boto3 resource for ``service_name`` in ``region_name`` using
+        the account credentials.  Resources are not thread safe, so they are
+        cached per thread until the credentials change.
+        '''
+        credentials = self.credentials
+        if getattr(self._local, 'credentials', None) is not credentials:
+            self._local.credentials = credentials
+            self._local.resources = OrderedDict()
+        resources = self._local.resources
+        key = (service_name, region_name)
+        if key not in resources:
+            resources[key] = utils.get_thread_session().resource(
+                service_name,
+                region_name=region_name,
+                **credentials
+            )
+            while len(resources) > ACCOUNT_CLIENT_CACHE_SIZE:
+                resources.popitem(last=False)
+        return resources[key]
 
     def load_credentials(self, access_role):
         if self.status == 'ACTIVE':
-            self.credentials = utils.assume_role_in_account(self.id, access_role)
+            self.credentials = self.retry_policy.call(
+                utils.assume_role_in_account, self.id, access_role,
+                cache=self.credential_cache)
+            self._access_role = access_role
+            self._credentials_error = None
+            self._credentials_expiration = self.credential_cache.expiration(
+                self.id, access_role)
+
+    def refresh_credentials(self, stale_credentials=None):
+        '''
+        Assume the access role again, bypassing the credential cache.  If
+        ``stale_credentials`` is given and the current credentials are
+        different, another thread already refreshed them and nothing is done.
+        '''
+        if self._access_role is None:
+            return
+        with self._credentials_lock:
+            if stale_credentials is None or self._credentials is stale_credentials:
+                self.credential_cache.invalidate(self.id, self._access_role)
+                self.load_credentials(self._access_role)
+
+    def _credentials_expiring(self):
+        expiration = self._credentials_expiration
+        if expiration is None or self._access_role is None:
+            return False
+        return time.time() >= expiration - self.credential_cache.refresh_margin
+
+    def set_access_role(self, access_role):
+        '''
+        Defer loading credentials for ``access_role`` until they are first
+        used.  Credentials loaded for a different role are discarded, as is
+        any earlier failure to load them.
+        '''
+        with self._credentials_lock:
+            if access_role != self._access_role:
+                self._credentials = {}
+            self._access_role = access_role
+            self._credentials_error = None
 
     def dump(self):
         account_dump = super(OrgAccount, self).dump()
@@ -766,3 +1381,97 @@ class OrgPolicy(OrgObject):
                 PolicyId=self.id,
             )
         )
+
+
+class OrgRegistry(object):
+    """
+    Process level registry of loaded Org objects for long running services.
+
+    Returns the same loaded Org object for repeated requests for one
+    (master_account_id, org_access_role) pair until it times out.  If
+    several threads request an Org which is not loaded, only one of them
+    loads it and the others wait for the result.  When the registry is
+    full, the least recently used Org object is dropped.
+
+    Args:
+        ttl (int): Minutes a loaded Org object is reused [Default: 45, less
+            than the one hour lifetime of the Org's client credentials].
+        max_entries (int): Maximum number of Org objects held [Default: 16].
+        org_kwargs: Keyword arguments passed to ``Org()``.
+    """
+
+    def __init__(self, ttl=45, max_entries=16, **org_kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.org_kwargs = org_kwargs
+        self._entries = OrderedDict()
+        self._load_locks = dict()
+        self._lock = threading.Lock()
+
+    def get_org(self, master_account_id, org_access_role):
+        """
+        Args:
+            master_account_id (str): Account Id of the Organization master account.
+            org_access_role (str): The IAM role to assume when loading
+                Organization resource data.
+        Returns:
+            Org: a loaded Org object
+        """
+        key = (master_account_id, org_access_role)
+        org = self._get_entry(key)
+        if org is not None:
+            return org
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            try:
+                # another thread may have loaded the org while we waited
+                org = self._get_entry(key)
+                if org is not None:
+                    return org
+                org = Org(master_account_id, org_access_role, **self.org_kwargs)
+                org.load()
+                with self._lock:
+                    self._entries[key] = (org, time.monotonic())
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            finally:
+                # threads already waiting keep their reference to load_lock
+                with self._lock:
+                    if self._load_locks.get(key) is load_lock:
+                        del self._load_locks[key]
+        return org
+
+    def clear(self):
+        """
+        Drop all Org objects from the registry
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            org, load_time = entry
+            if time.monotonic() - load_time > self.ttl * 60:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return org
+
+
+_registry = OrgRegistry()
+
+
+def get_org(master_account_id, org_access_role):
+    """
+    Return a loaded Org object from the default process level OrgRegistry.
+
+    Args:
+        master_account_id (str): Account Id of the Organization master account.
+        org_access_role (str): The IAM role to assume when loading
+            Organization resource data.
+    """
+    return _registry.get_org(master_account_id, org_access_role)
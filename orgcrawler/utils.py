@@ -1,15 +1,22 @@
+import os
 import sys
+import stat
+import tempfile
 import threading
-try:
-    import queue
-except ImportError:     # pragma: no cover
-    import Queue as queue
+import collections
+import concurrent.futures
+from contextlib import contextmanager
 import json
 import yaml
 import inspect
 import time
+import random
 from datetime import datetime
 from functools import singledispatch
+try:
+    import fcntl
+except ImportError:     # pragma: no cover
+    fcntl = None
 
 import boto3
 from botocore.exceptions import ClientError
@@ -19,6 +26,29 @@ from orgcrawler.logger import Logger
 
 DEFAULT_LOGLEVEL = 'warning'
 DEFAULT_THREAD_COUNT = 6
+EXECUTOR_CLASSES = dict(
+    thread=concurrent.futures.ThreadPoolExecutor,
+    process=concurrent.futures.ProcessPoolExecutor,
+)
+FIRST_ERROR = 'first_error'
+COLLECT_ALL = 'collect_all'
+CLIENT_CACHE_SIZE = 128
+THROTTLING_ERROR_CODES = [
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+]
+EXPIRED_CREDENTIALS_ERROR_CODES = [
+    'ExpiredToken',
+    'ExpiredTokenException',
+    'RequestExpired',
+]
+TRANSIENT_ERROR_CODES = [
+    'InternalFailure',
+    'InternalError',
+    'ServiceException',
+    'ServiceUnavailable',
+]
 
 
 def get_logger(log_level=DEFAULT_LOGLEVEL):
@@ -62,6 +92,18 @@ def jsonfmt(obj, default=to_serializable):
     )
 
 
+def ndjsonfmt(obj, default=to_serializable):
+    '''
+    Format obj as a single line of compact JSON, for newline delimited JSON
+    streams.
+    '''
+    return json.dumps(
+        obj,
+        separators=(',', ':'),
+        default=default,
+    )
+
+
 def yamlfmt(obj):
     if isinstance(obj, str):
         return obj
@@ -71,24 +113,219 @@ def yamlfmt(obj):
         return yaml.dump(str(obj))
 
 
-def assume_role_in_account(account_id, role_name):
+_clients = collections.OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name, region_name=None, credentials=None, config=None):
+    """
+    Thread safe boto3 client factory.  Returns a cached client for the same
+    service, region, credentials and botocore ``config`` object, or creates
+    one.  The least recently used clients are dropped beyond
+    ``CLIENT_CACHE_SIZE``.
+
+    Args:
+        service_name (str): boto3 service name, e.g. 'sts'
+        region_name (str): [Default: None, the boto3 default region]
+        credentials (dict): boto3 client keyword arguments as returned by
+            ``assume_role_in_account()`` [Default: None, the default
+            credential chain]
+        config (botocore.config.Config): client configuration.  Clients are
+            shared only among callers passing the same Config object
+            [Default: None]
+    """
+    credentials = credentials or dict()
+    key = (
+        service_name,
+        region_name,
+        tuple(sorted(credentials.items())),
+        None if config is None else id(config),
+    )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = boto3.client(
+                service_name,
+                region_name=region_name,
+                config=config,
+                **credentials
+            )
+            _clients[key] = client
+            while len(_clients) > CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(key)
+        return client
+
+
+def clear_client_cache():
+    """
+    Drop all clients cached by ``get_client()``
+    """
+    with _clients_lock:
+        _clients.clear()
+
+
+_thread_local = threading.local()
+
+
+def get_thread_session():
+    """
+    Return a boto3 session for the calling thread.  boto3 sessions are not
+    thread safe, so each thread creates clients from its own session, which
+    it reuses for all accounts and regions.
+    """
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = boto3.session.Session()
+        _thread_local.session = session
+    return session
+
+
+class CredentialCache(object):
+    """
+    Thread safe cache of assumed role credentials keyed by account Id and
+    role name.  Credentials are reused until ``refresh_margin`` seconds
+    before they expire.
+
+    If ``cache_dir`` is set, credentials are also saved there, one file per
+    account and role, readable only by the owner (mode 0600), so separate
+    processes can share them.  Cache files readable by others are ignored.
+
+    Args:
+        cache_dir (str): Directory for cache files [Default: None, memory only].
+        refresh_margin (int): Seconds before expiration at which credentials
+            are no longer returned [Default: 300].
+    """
+
+    def __init__(self, cache_dir=None, refresh_margin=300):
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.refresh_margin = refresh_margin
+        self._credentials = dict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id, role_name):
+        """
+        Return cached credentials as dict of boto3 client keyword arguments,
+        or None if there are none fresh enough.
+        """
+        key = (account_id, role_name)
+        with self._lock:
+            entry = self._credentials.get(key)
+        if entry is None and self.cache_dir is not None:
+            entry = self._read_cache_file(key)
+            if entry is not None:
+                with self._lock:
+                    self._credentials[key] = entry
+        if entry is None or entry['expiration'] - self.refresh_margin < time.time():
+            return None
+        return dict(entry['credentials'])
+
+    def put(self, account_id, role_name, credentials, expiration):
+        """
+        Cache ``credentials`` until ``expiration`` (seconds since the epoch).
+        """
+        key = (account_id, role_name)
+        entry = dict(credentials=dict(credentials), expiration=expiration)
+        with self._lock:
+            self._credentials[key] = entry
+        if self.cache_dir is not None:
+            self._write_cache_file(key, entry)
+
+    def expiration(self, account_id, role_name):
+        """
+        Return the expiration (seconds since the epoch) of the credentials
+        cached in memory, or None.
+        """
+        with self._lock:
+            entry = self._credentials.get((account_id, role_name))
+        return None if entry is None else entry['expiration']
+
+    def invalidate(self, account_id, role_name):
+        """
+        Remove cached credentials, for instance after they were rejected as
+        expired.
+        """
+        key = (account_id, role_name)
+        with self._lock:
+            self._credentials.pop(key, None)
+        if self.cache_dir is not None:
+            try:
+                os.remove(self._cache_file(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """
+        Remove all cached credentials from memory.  Cache files are kept.
+        """
+        with self._lock:
+            self._credentials = dict()
+
+    def _cache_file(self, key):
+        account_id, role_name = key
+        return os.path.join(
+            self.cache_dir,
+            'credentials-{}-{}.json'.format(account_id, role_name.replace('/', '_')),
+        )
+
+    def _read_cache_file(self, key):
+        try:
+            with open(self._cache_file(key)) as f:
+                if stat.S_IMODE(os.fstat(f.fileno()).st_mode) & 0o077:
+                    return None
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or not {'credentials', 'expiration'} <= set(entry):
+            return None
+        return entry
+
+    def _write_cache_file(self, key, entry):
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        # mkstemp creates the file with mode 0600
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, prefix='.credentials-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_file, self._cache_file(key))
+        except Exception:   # pragma: no cover
+            os.remove(tmp_file)
+            raise
+
+
+credential_cache = CredentialCache()
+
+
+def assume_role_in_account(account_id, role_name, cache=None):
+    """
+    Return credentials for IAM role ``role_name`` in account ``account_id``
+    as dict of boto3 client keyword arguments.  Credentials are taken from
+    ``cache`` when still valid [Default: module ``credential_cache``].
+    """
     # any exceptions must be caugh by calling function
+    cache = cache or credential_cache
+    cached_credentials = cache.get(account_id, role_name)
+    if cached_credentials is not None:
+        return cached_credentials
     role_arn = 'arn:aws:iam::{}:role/{}'.format(account_id, role_name)
     role_session_name = account_id + '-' + role_name.split('/')[-1]
-    sts_client = boto3.client('sts')
+    sts_client = get_client('sts')
     credentials = sts_client.assume_role(
         RoleArn=role_arn,
         RoleSessionName=role_session_name
     )['Credentials']
-    return dict(
+    client_credentials = dict(
         aws_access_key_id=credentials['AccessKeyId'],
         aws_secret_access_key=credentials['SecretAccessKey'],
         aws_session_token=credentials['SessionToken'],
     )
+    cache.put(account_id, role_name, client_credentials, credentials['Expiration'].timestamp())
+    return client_credentials
 
 
 def get_master_account_id(role_name=None):
-    sts_client = boto3.client('sts')
+    sts_client = get_client('sts')
     try:
         account_id = sts_client.get_caller_identity()['Account']
     except ClientError as e:    # pragma: no cover
@@ -102,45 +339,214 @@ def get_master_account_id(role_name=None):
             e.response['Error']['Code'],
         )
         sys.exit(errmsg)
-    client = boto3.client('organizations', **credentials)
+    client = get_client('organizations', credentials=credentials)
     try:
         return client.describe_organization()['Organization']['MasterAccountId']
     except ClientError as e:
         sys.exit(e)
 
 
+class TaskErrors(Exception):
+    """
+    Raised by ``run_tasks()`` under the COLLECT_ALL error policy when any
+    task failed.
+
+    Attributes:
+        errors (list): (item, exception) tuples for the failed tasks
+        results (list): task results in sequence order, None where failed
+    """
+
+    def __init__(self, errors, results):
+        super(TaskErrors, self).__init__('{} tasks failed: {}'.format(
+            len(errors), '; '.join(repr(e) for _, e in errors[:3])))
+        self.errors = errors
+        self.results = results
+
+
+def _init_worker_process():
+    """
+    Initializer for worker processes.  A forked worker inherits the parent's
+    cached boto3 clients, sessions and locks.  Replace them so the worker
+    creates its own clients and connections rather than sharing the
+    parent's.
+    """
+    global _clients, _clients_lock, _thread_local
+    _clients = collections.OrderedDict()
+    _clients_lock = threading.Lock()
+    _thread_local = threading.local()
+    credential_cache._lock = threading.Lock()
+    boto3.DEFAULT_SESSION = None
+
+
+def _executor_pool(executor, max_workers):
+    if executor == 'process':
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker_process,
+        )
+    return EXECUTOR_CLASSES[executor](max_workers=max_workers)
+
+
+def run_tasks(sequence, func, func_args=(), thread_count=DEFAULT_THREAD_COUNT,
+        error_policy=FIRST_ERROR, logger=None, executor='thread'):
+    """
+    Run ``func(item, *func_args)`` for each item of ``sequence`` in a bounded
+    pool of worker threads and return the results in sequence order.  With
+    ``executor='process'`` a pool of worker processes is used instead, in
+    which case ``func``, its arguments and results must be picklable.
+
+    At most twice ``thread_count`` tasks are submitted ahead of the workers,
+    so ``sequence`` may be a generator which is consumed as workers become
+    free.
+
+    Under the FIRST_ERROR policy the first exception raised by a task is
+    raised again after pending tasks are cancelled and running tasks have
+    finished.  Under COLLECT_ALL all tasks run and ``TaskErrors`` is raised
+    at the end if any failed.
+
+    Args:
+        sequence (iterable): items or data structures to iterate over
+        func (Function): python code to run within the threads
+        func_args (tuple): optional arguments for 'func'
+        thread_count (int): number of worker threads [Default: DEFAULT_THREAD_COUNT]
+        error_policy (str): FIRST_ERROR or COLLECT_ALL [Default: FIRST_ERROR]
+        logger (orgcrawler.logger.Logger): a logger instance [Default: None]
+        executor (str): 'thread' or 'process' [Default: 'thread']
+    """
+    if error_policy not in (FIRST_ERROR, COLLECT_ALL):
+        raise ValueError('invalid error_policy: {}'.format(error_policy))
+    if executor not in EXECUTOR_CLASSES:
+        raise ValueError('invalid executor: {}'.format(executor))
+    if logger is not None:
+        logger.info({
+            'FILE': __file__.split('/')[-1],
+            'METHOD': inspect.stack()[0][3],
+            'func': func,
+            'func_args': func_args,
+        })
+    thread_count = max(1, thread_count)
+    results = dict()
+    errors = []
+    task_items = dict()
+    pending = set()
+
+    def collect(done):
+        for future in sorted(done, key=lambda f: task_items[f][0]):
+            index, item = task_items.pop(future)
+            if future.exception() is None:
+                results[index] = future.result()
+            elif error_policy == FIRST_ERROR:
+                raise future.exception()
+            else:
+                results[index] = None
+                errors.append((item, future.exception()))
+
+    with _executor_pool(executor, thread_count) as pool:
+        try:
+            for index, item in enumerate(sequence):
+                if len(pending) >= thread_count * 2:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+                future = pool.submit(func, item, *func_args)
+                task_items[future] = (index, item)
+                pending.add(future)
+            done, pending = concurrent.futures.wait(
+                pending,
+                return_when=(
+                    concurrent.futures.FIRST_EXCEPTION if error_policy == FIRST_ERROR
+                    else concurrent.futures.ALL_COMPLETED
+                ),
+            )
+            collect(done)
+        finally:
+            for future in pending:
+                future.cancel()
+    results = [results[index] for index in sorted(results)]
+    if errors:
+        raise TaskErrors(errors, results)
+    return results
+
+
+def iter_tasks(sequence, func, func_args=(), thread_count=DEFAULT_THREAD_COUNT,
+        executor='thread'):
+    """
+    Generator version of ``run_tasks()``.  Yields ``(index, result)`` tuples
+    as tasks complete, where ``index`` is the position of the task's item in
+    ``sequence``.  Only the results of running tasks are held, so memory use
+    does not grow with the length of ``sequence``.
+
+    The first exception raised by a task is raised again after pending tasks
+    are cancelled.  Closing the generator early also cancels pending tasks.
+
+    Args:
+        sequence (iterable): items or data structures to iterate over
+        func (Function): python code to run within the threads
+        func_args (tuple): optional arguments for 'func'
+        thread_count (int): number of worker threads [Default: DEFAULT_THREAD_COUNT]
+        executor (str): 'thread' or 'process' [Default: 'thread']
+    """
+    if executor not in EXECUTOR_CLASSES:
+        raise ValueError('invalid executor: {}'.format(executor))
+    thread_count = max(1, thread_count)
+    task_indexes = dict()
+    pending = set()
+    with _executor_pool(executor, thread_count) as pool:
+        try:
+            items = enumerate(sequence)
+            while True:
+                for index, item in items:
+                    future = pool.submit(func, item, *func_args)
+                    task_indexes[future] = index
+                    pending.add(future)
+                    if len(pending) >= thread_count * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in sorted(done, key=task_indexes.get):
+                    yield task_indexes.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
 def queue_threads(sequence, func, func_args=(), thread_count=DEFAULT_THREAD_COUNT, logger=get_logger()):
     """
-    Generalized abstraction for running queued tasks in a thread pool
+    Generalized abstraction for running queued tasks in a thread pool.
+    Wrapper for ``run_tasks()`` with the FIRST_ERROR policy, discarding
+    results.
 
     Args:
-        sequence (list): list of items or data structures to iterate over
+        sequence (iterable): items or data structures to iterate over.  May be
+            a generator, in which case items are processed as it yields them.
         func (Function): python code to run within the threads
         func_args (tuple): optional arguments for 'func'
         thread_count (int): number of threads to create [Default: DEFAULT_THREAD_COUNT]
         logger (orgcrawler.logger.Logger): a logger instance [Default: get_logger()]
     """
-    message = {
-        'FILE': __file__.split('/')[-1],
-        'METHOD': inspect.stack()[0][3],
-        'func': func,
-        'func_args': func_args,
-    }
-    logger.info(message)
-
-    def worker(*args):
-        while not q.empty():
-            item = q.get()
-            func(item, *args)
-            q.task_done()
-    q = queue.Queue()
-    for item in sequence:
-        q.put(item)
-    for i in range(thread_count):
-        t = threading.Thread(target=worker, args=func_args)
-        t.setDaemon(True)
-        t.start()
-    q.join()
+    run_tasks(sequence, func, func_args, thread_count, FIRST_ERROR, logger)
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Context manager holding an exclusive advisory lock on ``path``, creating
+    the file if needed.  Blocks until the lock is acquired.  Where fcntl is
+    not available this does no locking.
+
+    Args:
+        path (str): path to the lock file
+    """
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 def regions_for_service(service_name):
@@ -157,39 +563,363 @@ def all_regions():
     return regions_for_service('ec2')
 
 
-def handle_nexttoken_and_retries(obj, collector_key, function, kwargs=dict()):
-    message = {
-        'FILE': __file__.split('/')[-1],
-        'FUNCTION': inspect.stack()[0][3],
-        'OBJECT': obj.__class__,
-        'object_id': obj.id,
-    }
-    obj.logger.info(message)
-    max_retry = 4
+class RateLimiter(object):
+    """
+    Thread safe, adaptive token bucket rate limiter for sharing an API
+    request rate among threads.
+
+    Requests are not limited until the first ``throttled()`` call.  The rate
+    is then set to half the request rate measured over the most recent
+    requests.  Each later ``throttled()`` call halves the rate and each
+    ``succeeded()`` call raises it by ``increase`` requests per second,
+    within ``min_rate`` and ``max_rate``.
+
+    Concurrent requests are often throttled together.  The rate is halved
+    at most once per ``decrease_interval`` seconds, so that one burst of
+    throttles is answered with a single decrease.
+
+    Args:
+        rate (float): Initial requests per second [Default: None, unlimited].
+        min_rate (float): Lowest requests per second [Default: 1].
+        max_rate (float): Highest requests per second [Default: None].
+        increase (float): Rate increase per successful request [Default: 0.1].
+        burst (int): Bucket size, the number of requests which may be made
+            at once after a quiet period [Default: 1].
+        decrease_interval (float): Seconds after a decrease during which
+            further throttles are ignored [Default: 1].
+    """
+
+    def __init__(self, rate=None, min_rate=1.0, max_rate=None, increase=0.1, burst=1,
+            decrease_interval=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.burst = burst
+        self.decrease_interval = decrease_interval
+        self._tokens = burst
+        self._last_time = time.monotonic()
+        self._last_decrease = None
+        self._request_times = collections.deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be made.  Tokens are reserved in the order
+        threads call acquire().
+        """
+        delay = 0
+        with self._lock:
+            now = time.monotonic()
+            self._request_times.append(now)
+            if self.rate is not None:
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._last_time) * self.rate,
+                )
+                self._tokens -= 1
+                delay = -self._tokens / self.rate
+            self._last_time = now
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttled(self):
+        """
+        Report a throttled request, halving the rate unless it was already
+        halved within the last ``decrease_interval`` seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            last = self._last_decrease
+            if last is not None and now - last < self.decrease_interval:
+                return
+            self._last_decrease = now
+            if self.rate is None:
+                self.rate = self._measured_rate()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+
+    def succeeded(self):
+        """
+        Report a successful request, raising the rate
+        """
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self.increase
+                if self.max_rate is not None:
+                    self.rate = min(self.max_rate, self.rate)
+
+    def _measured_rate(self):
+        if len(self._request_times) < 2:
+            return self.min_rate * 2
+        elapsed = self._request_times[-1] - self._request_times[0]
+        return (len(self._request_times) - 1) / max(elapsed, 0.001)
+
+
+class RetryPolicy(object):
+    """
+    Retry policy for boto3 client calls.  Throttling and transient server
+    errors are retried with capped exponential backoff and full jitter:
+    before retry n the caller sleeps a random time between 0 and
+    ``min(max_delay, base_delay * 2 ** n)`` seconds.
+
+    Args:
+        max_retries (int): Retries allowed per request [Default: 4].
+        base_delay (float): Backoff base in seconds [Default: 0.5].
+        max_delay (float): Backoff cap in seconds [Default: 20].
+        throttling_error_codes (list): Error codes which are retried and
+            reported to rate limiters [Default: THROTTLING_ERROR_CODES].
+        transient_error_codes (list): Further error codes which are
+            retried.  Responses with HTTP status 5xx are always retried
+            [Default: TRANSIENT_ERROR_CODES].
+    """
+
+    def __init__(self, max_retries=4, base_delay=0.5, max_delay=20,
+            throttling_error_codes=None, transient_error_codes=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttling_error_codes = (
+            THROTTLING_ERROR_CODES if throttling_error_codes is None
+            else throttling_error_codes
+        )
+        self.transient_error_codes = (
+            TRANSIENT_ERROR_CODES if transient_error_codes is None
+            else transient_error_codes
+        )
+
+    def is_throttle(self, error):
+        """
+        Return True if ClientError ``error`` is a throttling error
+        """
+        return error.response.get('Error', {}).get('Code') in self.throttling_error_codes
+
+    def is_retryable(self, error):
+        """
+        Return True if ClientError ``error`` should be retried
+        """
+        if self.is_throttle(error):
+            return True
+        if error.response.get('Error', {}).get('Code') in self.transient_error_codes:
+            return True
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return status is not None and status >= 500
+
+    def delay(self, retry_count):
+        """
+        Return the seconds to sleep before retry number ``retry_count``
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** retry_count))
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call ``function`` with ``args`` and ``kwargs``, retrying throttling
+        and transient errors.  Usable from payload functions::
+
+            retry_policy = utils.RetryPolicy()
+            response = retry_policy.call(client.list_buckets)
+        """
+        retry_count = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except ClientError as e:
+                if not self.is_retryable(e) or retry_count >= self.max_retries:
+                    raise
+                time.sleep(self.delay(retry_count))
+                retry_count += 1
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class ApiStats(object):
+    """
+    Thread safe per-operation counters for AWS API calls.  For each
+    operation name records the number of calls (paginated listings count
+    once), pages received, retries, failed requests which were not retried,
+    throttling errors and the latency of each request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = dict()
+
+    def _operation(self, operation):
+        return self._operations.setdefault(operation, dict(
+            calls=0,
+            pages=0,
+            retries=0,
+            errors=0,
+            throttles=0,
+            latencies=[],
+        ))
+
+    def record_call(self, operation):
+        with self._lock:
+            self._operation(operation)['calls'] += 1
+
+    def record_page(self, operation, latency):
+        with self._lock:
+            stats = self._operation(operation)
+            stats['pages'] += 1
+            stats['latencies'].append(latency)
+
+    def record_retry(self, operation, latency, throttled=False):
+        with self._lock:
+            stats = self._operation(operation)
+            stats['retries'] += 1
+            stats['throttles'] += int(throttled)
+            stats['latencies'].append(latency)
+
+    def record_error(self, operation, latency, throttled=False):
+        with self._lock:
+            stats = self._operation(operation)
+            stats['errors'] += 1
+            stats['throttles'] += int(throttled)
+            stats['latencies'].append(latency)
+
+    def reset(self):
+        with self._lock:
+            self._operations = dict()
+
+    def dump(self):
+        """
+        Return the stats as dict, keyed by operation name.  Latencies are
+        summarized in seconds as count, total, min, mean, p50, p90, p99
+        and max.
+        """
+        with self._lock:
+            operations = [(name, dict(stats)) for name, stats in self._operations.items()]
+        stats_dump = dict()
+        for name, stats in sorted(operations):
+            latencies = sorted(stats.pop('latencies'))
+            count = len(latencies)
+            latency = dict(count=count, total=round(sum(latencies), 6))
+            if count:
+                latency.update(
+                    min=round(latencies[0], 6),
+                    mean=round(sum(latencies) / count, 6),
+                    p50=round(latencies[int(count * 0.5)], 6),
+                    p90=round(latencies[min(count - 1, int(count * 0.9))], 6),
+                    p99=round(latencies[min(count - 1, int(count * 0.99))], 6),
+                    max=round(latencies[-1], 6),
+                )
+            stats['latency'] = latency
+            stats_dump[name] = stats
+        return stats_dump
+
+
+def paginate(function, collector_key=None, kwargs=None, retry_policy=None,
+        rate_limiter=None, input_token='NextToken', output_token=None, logger=None,
+        stats=None):
+    """
+    Generator calling a paginated boto3 client method page by page, yielding
+    results as each page arrives.  Each page request is retried according to
+    ``retry_policy`` and rate limited by ``rate_limiter``.  Only the current
+    page is held in memory::
+
+        s3_objects = utils.paginate(
+            client.list_objects_v2,
+            'Contents',
+            kwargs=dict(Bucket=bucket),
+            input_token='ContinuationToken',
+            output_token='NextContinuationToken',
+        )
+        for s3_object in s3_objects:
+            ...
+
+    Args:
+        function (Function): boto3 client method to call
+        collector_key (str): response key of the list of items to yield.  If
+            None, whole response pages are yielded [Default: None].
+        kwargs (dict): keyword arguments for ``function`` [Default: None].
+        retry_policy (:obj:`RetryPolicy`): [Default: DEFAULT_RETRY_POLICY].
+        rate_limiter (:obj:`RateLimiter`): [Default: None].
+        input_token (str): request parameter naming the next page
+            [Default: 'NextToken'].
+        output_token (str): response key of the next page token
+            [Default: same as ``input_token``].
+        logger (orgcrawler.logger.Logger): logger for retry warnings
+            [Default: None].
+        stats (:obj:`ApiStats`): records the call, its pages, retries and
+            errors under the name of ``function`` [Default: None].
+    """
+    kwargs = kwargs or dict()
+    retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+    output_token = output_token or input_token
+    operation = getattr(function, '__name__', repr(function))
+    if stats is not None:
+        stats.record_call(operation)
     retry_count = 0
     response = None
     next_token = None
-    collector = []
     while response is None or next_token is not None:
         try:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            start_time = time.perf_counter()
             if next_token is None:
                 response = function(**kwargs)
             else:
-                response = function(NextToken=next_token, **kwargs)
-            next_token = response.get('NextToken')
-            collector += response[collector_key]
+                response = function(**dict(kwargs, **{input_token: next_token}))
         except ClientError as e:
-            if e.response['Error']['Code'] == 'TooManyRequestsException':
-                if retry_count < max_retry:
-                    retry_count += 1
-                    message['passed_function'] = function
-                    message['error'] = 'TooManyRequestsException'
-                    message['retry_count'] = retry_count
-                    obj.logger.warning(message)
-                    time.sleep(1)
-                    continue
-                else:
-                    raise e
-            else:
-                raise e
-    return collector
+            throttled = retry_policy.is_throttle(e)
+            if rate_limiter is not None and throttled:
+                rate_limiter.throttled()
+            if retry_policy.is_retryable(e) and retry_count < retry_policy.max_retries:
+                if stats is not None:
+                    stats.record_retry(
+                        operation, time.perf_counter() - start_time, throttled)
+                if logger is not None:
+                    logger.warning({
+                        'FILE': __file__.split('/')[-1],
+                        'FUNCTION': 'paginate',
+                        'passed_function': function,
+                        'error': e.response['Error']['Code'],
+                        'retry_count': retry_count + 1,
+                    })
+                time.sleep(retry_policy.delay(retry_count))
+                retry_count += 1
+                continue
+            if stats is not None:
+                stats.record_error(
+                    operation, time.perf_counter() - start_time, throttled)
+            raise e
+        if stats is not None:
+            stats.record_page(operation, time.perf_counter() - start_time)
+        retry_count = 0
+        if rate_limiter is not None:
+            rate_limiter.succeeded()
+        next_token = response.get(output_token)
+        if collector_key is None:
+            yield response
+        else:
+            yield from response.get(collector_key, [])
+
+
+def handle_nexttoken_and_retries(obj, collector_key, function, kwargs=dict()):
+    """
+    Call ``function`` once per page of results, returning the list of items
+    under ``collector_key`` from all responses.  Page requests are retried
+    according to the ``retry_policy`` of ``obj`` and rate limited by its
+    ``rate_limiter`` and recorded in its ``load_stats``, when it has them.
+    See ``paginate()``.
+    """
+    message = {
+        'FILE': __file__.split('/')[-1],
+        'FUNCTION': inspect.stack()[0][3],
+        'OBJECT': obj.__class__,
+        'object_id': obj.id,
+    }
+    obj.logger.info(message)
+    return list(paginate(
+        function,
+        collector_key,
+        kwargs=kwargs,
+        retry_policy=getattr(obj, 'retry_policy', None),
+        rate_limiter=getattr(obj, 'rate_limiter', None),
+        logger=obj.logger,
+        stats=getattr(obj, 'load_stats', None),
+    ))
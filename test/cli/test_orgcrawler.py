@@ -1,3 +1,6 @@
+import os
+import json
+
 import pytest
 from click.testing import CliRunner
 from moto import (
@@ -7,6 +10,7 @@ from moto import (
 )
 
 import orgcrawler
+from orgcrawler import utils
 from orgcrawler.cli import orgcrawler
 from orgcrawler.mock import payload
 from orgcrawler.mock.org import (
@@ -25,6 +29,7 @@ from orgcrawler.mock.org import (
     (['--master-role', ORG_ACCESS_ROLE, 'orgcrawler.mock.payload.get_mock_account_alias']),
     (['-r', ORG_ACCESS_ROLE, '--accounts', 'account01,account02', 'orgcrawler.mock.payload.get_mock_account_alias']),
     (['-r', ORG_ACCESS_ROLE, '--regions', 'us-west-2', 'orgcrawler.mock.payload.get_mock_account_alias']),
+    (['-r', ORG_ACCESS_ROLE, '--lazy-credentials', 'orgcrawler.mock.payload.get_mock_account_alias']),
     (['-r', ORG_ACCESS_ROLE, '--service', 'iam', 'orgcrawler.mock.payload.get_mock_account_alias']),
     (['-r', ORG_ACCESS_ROLE, 'orgcrawler.mock.payload.get_mock_account_alias', '--account-role', ORG_ACCESS_ROLE]),
     (['-r', ORG_ACCESS_ROLE, 'get_mock_account_alias', '--payload-file', payload.__file__]),
@@ -90,3 +95,48 @@ def test_orgcrawler_failure(options_list):
         options_list,
     )
     assert result.exit_code != 0
+
+
+@mock_sts
+@mock_organizations
+@mock_iam
+def test_orgcrawler_credential_cache_dir(tmpdir):
+    MockOrganization().simple()
+    credential_cache = utils.credential_cache
+    runner = CliRunner()
+    result = runner.invoke(
+        orgcrawler.main,
+        ['-r', ORG_ACCESS_ROLE, '--credential-cache-dir', str(tmpdir),
+            'orgcrawler.mock.payload.get_mock_account_alias'],
+    )
+    assert result.exit_code == 0
+    assert utils.credential_cache is credential_cache
+    assert utils.credential_cache.cache_dir is None
+    assert len(os.listdir(str(tmpdir))) > 0
+
+
+@mock_sts
+@mock_organizations
+@mock_iam
+def test_orgcrawler_ndjson_output():
+    MockOrganization().simple()
+    runner = CliRunner()
+    result = runner.invoke(
+        orgcrawler.main,
+        ['-r', ORG_ACCESS_ROLE, '--regions', 'us-west-2,us-east-1', '--output', 'ndjson',
+            'orgcrawler.mock.payload.mixed_params', 'cat', 'dog', 'rat'],
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    responses = [json.loads(line) for line in lines]
+    assert all(line == json.dumps(r, separators=(',', ':')) for line, r in zip(lines, responses))
+    assert len(responses) == len(set((r['Account'], r['Region']) for r in responses))
+    assert set(r['Region'] for r in responses) == set(['us-west-2', 'us-east-1'])
+    assert all(r['Output']['params']['arg1'] == 'cat' for r in responses)
+
+    result = runner.invoke(
+        orgcrawler.main,
+        ['-r', ORG_ACCESS_ROLE, '-o', 'ndjson', 'orgcrawler.mock.payload.get_mock_account_alias'],
+    )
+    assert result.exit_code == 0
+    assert result.output == ''
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from click.testing import CliRunner
 from moto import (
@@ -36,6 +38,7 @@ def test_jsonfmt():
     (['--role', ORG_ACCESS_ROLE, '--format', 'yaml', 'dump']),
     (['--role', ORG_ACCESS_ROLE, '--format', 'yaml', 'list_accounts_in_ou', 'root']),
     (['--role', ORG_ACCESS_ROLE, '--debug', 'list_accounts_by_name']),
+    (['--role', ORG_ACCESS_ROLE, '--stats', 'list_accounts_by_name']),
     (['--role', ORG_ACCESS_ROLE, '--debug', '--debug', 'list_accounts_by_name']),
 ])
 def test_orgquery_success(options_list):
@@ -48,6 +51,20 @@ def test_orgquery_success(options_list):
     assert result.exit_code == 0
 
 
+@mock_sts
+@mock_organizations
+def test_orgquery_stats():
+    MockOrganization().simple()
+    orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE).clear_cache()
+    runner = CliRunner()
+    result = runner.invoke(orgquery.main, ['--role', ORG_ACCESS_ROLE, '--stats', 'dump'])
+    assert result.exit_code == 0
+    assert 'list_accounts' in json.loads(result.stderr)
+    result = runner.invoke(orgquery.main, ['--role', ORG_ACCESS_ROLE, '--stats', 'dump'])
+    assert result.exit_code == 0
+    assert result.stderr == 'No AWS API calls made: organization loaded from cache file\n'
+
+
 @mock_sts
 @mock_organizations
 @pytest.mark.parametrize('options_list', [
@@ -7,7 +7,7 @@ from moto import (
 )
 
 import orgcrawler
-from orgcrawler import crawlers
+from orgcrawler import crawlers, utils
 from orgcrawler.orgs import Org, OrgAccount
 from orgcrawler.utils import yamlfmt
 from orgcrawler.cli.utils import (
@@ -15,6 +15,8 @@ from orgcrawler.cli.utils import (
     get_payload_function_from_file,
     setup_crawler,
     format_responses,
+    format_response,
+    is_empty_response,
 )
 from orgcrawler.mock import payload
 from orgcrawler.mock.org import (
@@ -39,7 +41,7 @@ def test_get_payload_function_from_file():
 @mock_sts
 @mock_organizations
 @mock_iam
-def test_setup_crawler():
+def test_setup_crawler(tmpdir):
     Org('no_id', 'no_role').clear_cache()
     MockOrganization().simple()
     crawler = setup_crawler(ORG_ACCESS_ROLE)
@@ -59,6 +61,15 @@ def test_setup_crawler():
     assert len(crawler.regions) == 2
     assert set([a.name for a in crawler.accounts]) == set(['account02', 'account03'])
     assert set(crawler.regions) == set(['us-west-2', 'us-east-1'])
+
+    credential_cache = utils.credential_cache
+    cache_dir = os.path.join(str(tmpdir), 'credentials')
+    crawler = setup_crawler(ORG_ACCESS_ROLE, credential_cache_dir=cache_dir)
+    assert utils.credential_cache is credential_cache
+    assert crawler.org.credential_cache.cache_dir == cache_dir
+    for account in crawler.accounts:
+        assert account.credential_cache is crawler.org.credential_cache
+        assert 'credentials-{}-{}.json'.format(account.id, ORG_ACCESS_ROLE) in os.listdir(cache_dir)
     with pytest.raises(TypeError):
         crawler = setup_crawler()
     with pytest.raises(ValueError):
@@ -81,3 +92,24 @@ def test_format_responses():
     for response in execution_responses:
         assert 'Account' in response
         assert 'Regions' in response
+
+
+@mock_sts
+@mock_organizations
+@mock_iam
+def test_format_response():
+    MockOrganization().simple()
+    crawler = setup_crawler(ORG_ACCESS_ROLE, regions='us-west-2')
+    execution = crawler.execute(payload.kwarg_params, kwarg1='cat')
+    response = execution.responses[0]
+    assert not is_empty_response(response)
+    assert format_response(response) == dict(
+        Account=response.account.name,
+        Region='us-west-2',
+        Output=response.payload_output,
+    )
+    execution = crawler.execute(payload.get_mock_account_alias)
+    assert is_empty_response(execution.responses[0])
+    response = crawlers.CrawlerResponse('us-west-2', crawler.accounts[0])
+    response.exc_info = (ValueError, ValueError(), None)
+    assert is_empty_response(response)
@@ -0,0 +1,12 @@
+import pytest
+
+from orgcrawler import utils
+
+
+@pytest.fixture(autouse=True)
+def clear_credential_and_client_caches():
+    # moto forgets its assumed roles between tests, so credentials cached by
+    # one test are not valid in the next
+    utils.credential_cache.clear()
+    utils.clear_client_cache()
+    yield
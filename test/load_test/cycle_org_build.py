@@ -16,6 +16,7 @@ cycle_timer = crawlers.CrawlerTimer()
 master_account_id = utils.get_master_account_id(role)
 longest_time = 0
 shortest_time = None
+load_stats = None
 
 timer.start()
 for i in range(cycles):
@@ -23,6 +24,7 @@ for i in range(cycles):
     try:
         org = orgs.Org(master_account_id, role)
         org.load()
+        load_stats = org.load_stats.dump()
     except ClientError as e:
         errors += 1
         print(e)
@@ -43,5 +45,7 @@ print('elapsed time:', round(timer.elapsed_time, 2))
 print('average time:', round(timer.elapsed_time/cycles, 2))
 print('longest time:', round(longest_time, 2))
 print('shortest time:', round(shortest_time, 2))
+print('api stats of last cycle:')
+print(utils.jsonfmt(load_stats))
 
 
@@ -1,7 +1,11 @@
+import os
 import time
+import asyncio
+import threading
 from inspect import isfunction
 
 import pytest
+from botocore.exceptions import ClientError
 from moto import (
     mock_organizations,
     mock_sts,
@@ -150,7 +154,7 @@ def test_crawler_init():
 
 @mock_sts
 @mock_organizations
-def test_load_account_credentials():
+def test_load_account_credentials(monkeypatch):
     MockOrganization().complex()
     org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
     org.load()
@@ -161,6 +165,302 @@ def test_load_account_credentials():
     for account in crawler.accounts:
         assert isinstance(account.credentials, dict)
 
+    def access_denied(self, access_role):
+        if self.name == 'account01':
+            raise ClientError({'Error': {'Code': 'AccessDenied'}}, 'AssumeRole')
+
+    monkeypatch.setattr(orgs.OrgAccount, 'load_credentials', access_denied)
+    with pytest.raises(SystemExit) as e:
+        crawler.load_account_credentials()
+    assert str(e.value) == 'cannot assume role {} in 1 accounts, e.g. account01: AccessDenied'.format(
+        ORG_ACCESS_ROLE)
+
+    def broken(self, access_role):
+        raise ValueError(self.name)
+
+    monkeypatch.setattr(orgs.OrgAccount, 'load_credentials', broken)
+    with pytest.raises(ValueError):
+        crawler.load_account_credentials()
+
+
+@mock_sts
+@mock_organizations
+def test_thread_count(tmpdir):
+    MockOrganization().complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_dir=str(tmpdir))
+    org.load()
+    crawler = crawlers.Crawler(org)
+    assert crawler.thread_count == crawlers.DEFAULT_THREAD_COUNT
+    crawler = crawlers.Crawler(org, regions=['us-west-2', 'us-east-2'], thread_count=3)
+    assert crawler.thread_count == 3
+    crawler.load_account_credentials()
+    lock = threading.Lock()
+    active = []
+    most_active = []
+
+    def count_active_threads(region, account, **kwargs):
+        with lock:
+            active.append(account)
+            most_active.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+
+    crawler.execute(count_active_threads)
+    assert max(most_active) == 3
+    most_active.clear()
+    crawler.execute(count_active_threads, thread_count=2)
+    assert max(most_active) == 2
+    assert len(most_active) == len(crawler.accounts) * 2
+
+
+@mock_sts
+@mock_organizations
+@mock_iam
+def test_execute_refreshes_expired_credentials(tmpdir):
+    MockOrganization().simple()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_dir=str(tmpdir))
+    org.load()
+    crawler = crawlers.Crawler(org, regions=['us-west-2', 'us-east-2'])
+    crawler.load_account_credentials()
+    first_credentials = dict((a.id, a.credentials) for a in crawler.accounts)
+
+    def expired_once_payload(region, account):
+        if account.credentials is first_credentials[account.id]:
+            raise ClientError({'Error': {'Code': 'ExpiredToken'}}, 'mock_function')
+        return account.get_client('iam', region).list_account_aliases()['AccountAliases']
+
+    execution = crawler.execute(expired_once_payload)
+    assert execution.errors == 0
+    for account in crawler.accounts:
+        assert account.credentials != first_credentials[account.id]
+
+    def expired_payload(region, account):
+        raise ClientError({'Error': {'Code': 'ExpiredToken'}}, 'mock_function')
+
+    with pytest.raises(SystemExit):
+        crawler.execute(expired_payload)
+    assert crawler.get_execution('expired_payload').errors == len(crawler.accounts) * 2
+
+    def access_denied_payload(region, account):
+        raise ClientError({'Error': {'Code': 'AccessDenied'}}, 'mock_function')
+
+    credentials = dict((a.id, a.credentials) for a in crawler.accounts)
+    with pytest.raises(SystemExit):
+        crawler.execute(access_denied_payload)
+    for account in crawler.accounts:
+        assert account.credentials is credentials[account.id]
+
+
+def sum_of_squares(region, account, count=1000, **kwargs):
+    return os.getpid(), sum(i * i for i in range(count))
+
+
+def fail_in_process(region, account):
+    raise ValueError(account.name)
+
+
+@mock_sts
+@mock_organizations
+def test_execute_in_processes(tmpdir):
+    MockOrganization().simple()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_dir=str(tmpdir))
+    org.load()
+    crawler = crawlers.Crawler(org, regions=['us-west-2', 'us-east-2'])
+    crawler.load_account_credentials()
+    execution = crawler.execute(sum_of_squares, count=10, executor='process', thread_count=2)
+    assert execution.errors == 0
+    assert len(execution.responses) == len(crawler.accounts) * 2
+    assert [(r.region, r.account) for r in execution.responses] == [
+        (region, account) for region in crawler.regions for account in crawler.accounts]
+    assert all(r.payload_output[1] == 285 for r in execution.responses)
+    assert os.getpid() not in set(r.payload_output[0] for r in execution.responses)
+
+    with pytest.raises(SystemExit):
+        crawler.execute(fail_in_process, executor='process')
+    execution = crawler.get_execution('fail_in_process')
+    assert execution.errors == len(crawler.accounts) * 2
+    error = execution.responses[0].exc_info[1]
+    assert isinstance(error, ValueError)
+    assert isinstance(error.__cause__, crawlers.RemoteTraceback)
+    assert 'fail_in_process' in str(error.__cause__)
+
+    with pytest.raises(ValueError):
+        crawler.execute(sum_of_squares, executor='blee')
+
+    account = org.accounts[0]
+    task = crawler._process_task(dict(region='us-west-2', account=account))
+    assert task['credentials'] == account.credentials
+    crawlers._process_accounts.clear()
+    worker_account = crawlers._get_process_account(task)
+    assert worker_account.id == account.id
+    assert worker_account.credentials == account.credentials
+    assert crawlers._get_process_account(task) is worker_account
+    crawlers._process_accounts.clear()
+    crawler = crawlers.Crawler(org, lazy_credentials=True)
+    task = crawler._process_task(dict(region='us-west-2', account=account))
+    assert task['credentials'] == {}
+    assert 'aws_session_token' in crawlers._get_process_account(task).credentials
+    crawlers._process_accounts.clear()
+
+    class Unpicklable(Exception):
+        def __reduce__(self):
+            raise TypeError('cannot pickle')
+
+    def raise_unpicklable(region, account):
+        raise Unpicklable('blee')
+
+    task = crawler._process_task(dict(region='us-west-2', account=account))
+    result = crawlers.run_payload_in_process(task, raise_unpicklable, (), {})
+    assert isinstance(result['error'], RuntimeError)
+    assert 'Unpicklable' in result['traceback']
+    crawlers._process_accounts.clear()
+
+
+@mock_sts
+@mock_organizations
+def test_execute_iter(tmpdir):
+    MockOrganization().simple()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_dir=str(tmpdir))
+    org.load()
+    crawler = crawlers.Crawler(org, regions=['us-west-2', 'us-east-2'], thread_count=4)
+    crawler.load_account_credentials()
+    slowest = crawler.accounts[0]
+
+    def slow_first_account(region, account):
+        if account is slowest:
+            time.sleep(0.2)
+        return account.id
+
+    responses = crawler.execute_iter(slow_first_account)
+    first = next(responses)
+    assert first.account is not slowest
+    assert crawler.get_execution('slow_first_account') is None
+    responses = [first] + list(responses)
+    execution = crawler.get_execution('slow_first_account')
+    assert execution.responses == responses
+    assert len(responses) == len(crawler.accounts) * 2
+    assert responses[-1].account is slowest
+    assert all(r.payload_output == r.account.id for r in responses)
+
+    responses = list(crawler.execute_iter(
+        sum_of_squares, count=10, executor='process', keep_responses=False))
+    assert len(responses) == len(crawler.accounts) * 2
+    assert all(r.payload_output[1] == 285 for r in responses)
+    assert crawler.executions[-1].responses == []
+
+    with pytest.raises(SystemExit):
+        for response in crawler.execute_iter(fail_in_process, keep_responses=False):
+            assert isinstance(response.exc_info[1], ValueError)
+    execution = crawler.get_execution('fail_in_process')
+    assert execution.errors == len(crawler.accounts) * 2
+    assert execution.responses == []
+
+    with pytest.raises(ValueError):
+        next(crawler.execute_iter(slow_first_account, executor='blee'))
+
+
+@mock_sts
+@mock_organizations
+@mock_iam
+def test_execute_async(tmpdir):
+    MockOrganization().simple()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_dir=str(tmpdir))
+    org.load()
+    crawler = crawlers.Crawler(org, regions=['us-west-2', 'us-east-2'], lazy_credentials=True)
+    crawler.load_account_credentials()
+    active = []
+    most_active = []
+    expired = set()
+
+    async def async_payload(region, account, suffix=''):
+        active.append(account)
+        most_active.append(len(active))
+        await asyncio.sleep(0.02)
+        active.pop()
+        if account.id not in expired:
+            expired.add(account.id)
+            raise ClientError({'Error': {'Code': 'ExpiredToken'}}, 'mock_function')
+        assert 'aws_session_token' in account.credentials
+        return account.id + suffix
+
+    execution = asyncio.run(crawler.execute_async(async_payload, suffix='-x', concurrency=3))
+    assert crawler.executions[-1] is execution
+    assert execution.name == 'async_payload'
+    assert execution.errors == 0
+    assert len(execution.responses) == len(crawler.accounts) * 2
+    assert max(most_active) == 3
+    assert [r.payload_output for r in execution.responses] == [
+        a.id + '-x' for region in crawler.regions for a in crawler.accounts]
+
+    execution = asyncio.run(crawler.execute_async(kwarg_params, kwarg1='cat'))
+    assert execution.name == 'kwarg_params'
+    for response in execution.responses:
+        assert response.payload_output['params']['kwarg1'] == 'cat'
+
+    async def async_bad_payload(region, account):
+        raise ValueError(account.name)
+
+    with pytest.raises(SystemExit):
+        asyncio.run(crawler.execute_async(async_bad_payload))
+    assert crawler.get_execution('async_bad_payload').errors == len(crawler.accounts) * 2
+
+    async def async_access_denied_payload(region, account):
+        raise ClientError({'Error': {'Code': 'AccessDenied'}}, 'mock_function')
+
+    with pytest.raises(SystemExit):
+        asyncio.run(crawler.execute_async(async_access_denied_payload))
+
+
+@mock_sts
+@mock_organizations
+@mock_iam
+def test_lazy_account_credentials(monkeypatch, tmpdir):
+    MockOrganization().complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_dir=str(tmpdir))
+    org.load()
+    assume_role_calls = []
+    assume_role_in_account = utils.assume_role_in_account
+
+    def slow_assume_role_in_account(account_id, role_name, cache=None):
+        assume_role_calls.append(account_id)
+        time.sleep(0.1)
+        return assume_role_in_account(account_id, role_name, utils.CredentialCache())
+
+    monkeypatch.setattr(utils, 'assume_role_in_account', slow_assume_role_in_account)
+    crawler = crawlers.Crawler(
+        org,
+        accounts='account01',
+        regions=['us-west-2', 'us-east-2', 'us-west-1', 'eu-west-1'],
+        lazy_credentials=True,
+    )
+    crawler.load_account_credentials()
+    assert assume_role_calls == []
+    execution = crawler.execute(get_mock_account_alias)
+    assert execution.errors == 0
+    assert assume_role_calls == [crawler.accounts[0].id]
+    assert 'aws_session_token' in crawler.accounts[0].credentials
+    assert org.get_account('account02')._credentials == {}
+
+    # a failed AssumeRole is not repeated for each region
+    def access_denied(account_id, role_name, cache=None):
+        assume_role_calls.append(account_id)
+        raise ClientError({'Error': {'Code': 'AccessDenied'}}, 'AssumeRole')
+
+    monkeypatch.setattr(utils, 'assume_role_in_account', access_denied)
+    crawler.update_accounts('account02')
+    crawler.load_account_credentials()
+    assume_role_calls.clear()
+    with pytest.raises(SystemExit):
+        crawler.execute(get_mock_account_alias)
+    execution = crawler.executions[-1]
+    assert execution.errors == len(crawler.regions)
+    assert assume_role_calls == [crawler.accounts[0].id]
+    # each execution tries again
+    with pytest.raises(SystemExit):
+        crawler.execute(get_mock_account_alias)
+    assert assume_role_calls == [crawler.accounts[0].id] * 2
+
 
 @mock_sts
 @mock_organizations
@@ -4,6 +4,7 @@ import time
 import json
 import pickle
 import shutil
+import threading
 
 import yaml
 import botocore
@@ -64,6 +65,12 @@ def test_org_objects():
 
     org_object = orgs.OrgObject(org, name='generic')
     assert isinstance(org_object, orgs.OrgObject)
+    assert org_object.rate_limiter is org.rate_limiter
+    assert 'rate_limiter' not in org_object.dump()
+    assert org_object.retry_policy is utils.DEFAULT_RETRY_POLICY
+    assert 'retry_policy' not in org_object.dump()
+    assert org_object.load_stats is org.load_stats
+    assert 'load_stats' not in org_object.dump()
     assert org_object.organization_id == org.id
     assert org_object.master_account_id == org.master_account_id
     assert org_object.name == 'generic'
@@ -95,6 +102,75 @@ def test_org_objects():
     assert account.id == '112233445566'
     assert account.parent_id == org.root_id
     assert account.email == 'account01@example.org'
+    assert account.credentials == {}
+    account.refresh_credentials()
+    assert account.credentials == {}
+    account.credentials = dict(aws_access_key_id='key_id')
+    assert account.credentials == dict(aws_access_key_id='key_id')
+    account.set_access_role(ORG_ACCESS_ROLE)
+    assert account._credentials == {}
+    assert 'aws_session_token' in account.credentials
+    credentials = account.credentials
+    account.set_access_role(ORG_ACCESS_ROLE)
+    assert account.credentials is credentials
+    assert account.dump()['credentials'] == {}
+    assert not [key for key in account.dump() if key.startswith('_')]
+
+    # renew credentials near expiry, on use
+    assert account._credentials_expiration > time.time() + 3000
+    account._credentials_expiration = time.time() + 100
+    with account._credentials_lock:
+        assert account.credentials is credentials
+    assert account.credentials == credentials
+    assert account._credentials_expiration > time.time() + 3000
+    credentials = account.credentials
+    account.refresh_credentials(stale_credentials=dict())
+    assert account.credentials is credentials
+    account.refresh_credentials(stale_credentials=credentials)
+    assert account.credentials != credentials
+    credentials = account.credentials
+
+    client = account.get_client('s3', 'us-east-1')
+    assert account.get_client('s3', 'us-east-1') is client
+    assert account.get_client('s3', 'us-west-2') is not client
+    assert client.meta.region_name == 'us-east-1'
+    resource = account.get_resource('s3', 'us-east-1')
+    assert account.get_resource('s3', 'us-east-1') is resource
+    clients = []
+    resources = []
+
+    def get_client_and_resource(item):
+        clients.append(account.get_client('s3', 'us-east-1'))
+        resources.append(account.get_resource('s3', 'us-east-1'))
+    utils.queue_threads(range(4), get_client_and_resource, thread_count=4)
+    assert all(c is client for c in clients)
+    assert all(r is not resource for r in resources)
+    account.credentials = dict(credentials)
+    assert account.get_client('s3', 'us-east-1') is not client
+    assert account.get_resource('s3', 'us-east-1') is not resource
+    for i in range(orgs.ACCOUNT_CLIENT_CACHE_SIZE + 1):
+        account.get_client('s3', 'region-{}'.format(i))
+        account.get_resource('s3', 'region-{}'.format(i))
+    assert len(account._clients) == orgs.ACCOUNT_CLIENT_CACHE_SIZE
+    assert len(account._local.resources) == orgs.ACCOUNT_CLIENT_CACHE_SIZE
+
+    # credentials are cached in the org's credential cache
+    assert account.credential_cache is utils.credential_cache
+    credential_cache = utils.CredentialCache()
+    org_with_cache = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, credential_cache=credential_cache)
+    account = orgs.OrgAccount(
+        org_with_cache,
+        name='account02',
+        id='223344556677',
+        email='account02@example.org',
+        status='ACTIVE',
+    )
+    assert account.credential_cache is credential_cache
+    account.load_credentials(ORG_ACCESS_ROLE)
+    assert credential_cache.get(account.id, ORG_ACCESS_ROLE) == account.credentials
+    assert utils.credential_cache.get(account.id, ORG_ACCESS_ROLE) is None
+    assert 'credential_cache' not in account.dump()
+    assert 'credential_cache' not in org_with_cache.dump()
 
     ou = orgs.OrganizationalUnit(
         org,
@@ -123,6 +199,25 @@ def test_load_accounts():
     assert org.accounts[0].parent_id == org.root_id
 
 
+@mock_sts
+@mock_organizations
+def test_load_account_parents_from_org_units(monkeypatch):
+    MockOrganization().complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org._load_client()
+    org._load_org()
+    org._load_org_units()
+    assert len(org._account_parent_ids) == 14
+
+    def no_list_parents(self):
+        raise AssertionError('list_parents called for {}'.format(self.name))
+    monkeypatch.setattr(orgs.OrgObject, 'get_parent_id', no_list_parents)
+    org._load_accounts()
+    for account in org.accounts:
+        parents = org.client.list_parents(ChildId=account.id)['Parents']
+        assert account.parent_id == parents[0]['Id']
+
+
 @mock_sts
 @mock_organizations
 def test_load_org_units():
@@ -133,6 +228,8 @@ def test_load_org_units():
     org._load_org_units()
     for ou in org.org_units:
         assert isinstance(ou, orgs.OrganizationalUnit)
+    assert org.list_org_units_by_name() == [
+        'ou01', 'ou01-sub0', 'ou02', 'ou02-sub0', 'ou03', 'ou03-sub0']
 
  
 @mock_sts
@@ -147,6 +244,27 @@ def test_load_policies():
         assert isinstance(policy, orgs.OrgPolicy)
 
 
+@mock_sts
+@mock_organizations
+def test_load_attached_policy_ids():
+    MockOrganization().complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org._load_client()
+    org._load_org()
+    org._load_org_units()
+    org._load_accounts()
+    org._load_policies()
+    assert org.list_policies_by_id() == [
+        p['Id'] for p in org.client.list_policies(
+            Filter='SERVICE_CONTROL_POLICY')['Policies']
+    ]
+    org._load_attached_policy_ids()
+    for org_object in org.accounts + org.org_units:
+        attached_policy_ids = org_object.attached_policy_ids
+        org_object.load_attached_policy_ids()
+        assert sorted(attached_policy_ids) == sorted(org_object.attached_policy_ids)
+
+
 @mock_sts
 @mock_organizations
 def test_org_cache():
@@ -186,6 +304,127 @@ def test_org_cache():
     assert org.dump() == org_from_cache.dump()
 
 
+@mock_sts
+@mock_organizations
+def test_org_cache_format():
+    MockOrganization().complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org.clear_cache()
+    org.load()
+    with open(org._cache_file, 'rb') as cf:
+        data = cf.read()
+    header, body = data.split(b'\n', 1)
+    header = json.loads(header.decode())
+    assert header['format'] == orgs.CACHE_FORMAT
+    assert header['schema_version'] == orgs.CACHE_SCHEMA_VERSION
+    assert 'created' in header
+    assert b'organization_id' not in body
+    assert orgs.Org._decode_cache(data) == org.dump()
+    org_dump = org.dump()
+    org_dump['accounts'][0]['parent_id'] = None
+    org_dump['accounts'][0]['attached_policy_ids'] = None
+    assert orgs.Org._decode_cache(orgs.Org._encode_cache(org_dump)) == org_dump
+
+    bad_version = dict(header, schema_version=orgs.CACHE_SCHEMA_VERSION + 1)
+    with pytest.raises(RuntimeError) as e:
+        orgs.Org._decode_cache(json.dumps(bad_version).encode() + b'\n' + body)
+    assert str(e.value) == 'Cache file version mismatch'
+    with pytest.raises(RuntimeError) as e:
+        orgs.Org._decode_cache(data[:-2] + b'}}')
+    assert str(e.value) == 'Cache file checksum mismatch'
+    with pytest.raises(RuntimeError) as e:
+        orgs.Org._decode_cache(pickle.dumps(org.dump()))
+    assert str(e.value) == 'Cache file format not recognized'
+
+    # an unusable cache file falls back to a reload
+    with open(org._cache_file, 'wb') as pf:
+        pickle.dump(org.dump(), pf)
+    org_from_api = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org_from_api.load()
+    assert sorted_org_dump(org_from_api) == sorted_org_dump(org)
+    assert org_from_api._get_cached_org_from_file() == org_from_api.dump()
+    org.clear_cache()
+
+
+@mock_sts
+@mock_organizations
+def test_org_cache_locking(monkeypatch):
+    MockOrganization().simple()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org.clear_cache()
+    org.load()
+    assert os.stat(org._cache_file).st_mode & 0o777 == 0o600
+    assert sorted(os.listdir(org._cache_dir)) == sorted([
+        os.path.basename(org._cache_file),
+        os.path.basename(org._cache_lock_file),
+    ])
+
+    # a failed write leaves the previous cache file in place
+    def bad_encode(org_dump):
+        raise ValueError('bad encode')
+    monkeypatch.setattr(orgs.Org, '_encode_cache', staticmethod(bad_encode))
+    with pytest.raises(ValueError):
+        org._save_cached_org_to_file()
+    assert len(os.listdir(org._cache_dir)) == 2
+    monkeypatch.undo()
+    assert org._get_cached_org_from_file() == org.dump()
+
+    # while another process reloads, load() waits and then uses its result
+    timestamp = os.path.getmtime(org._cache_file) - 7200
+    os.utime(org._cache_file, (timestamp, timestamp))
+    waiting_org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+
+    def no_reload(previous_org_dump=None):
+        raise AssertionError('org reloaded from api')
+    monkeypatch.setattr(waiting_org, '_load_org_from_api', no_reload)
+    with utils.file_lock(org._cache_lock_file):
+        thread = threading.Thread(target=waiting_org.load)
+        thread.start()
+        thread.join(1)
+        assert thread.is_alive()
+        org._save_cached_org_to_file()
+    thread.join()
+    assert waiting_org.dump() == org.dump()
+    org.clear_cache()
+
+
+@mock_sts
+@mock_organizations
+def test_load_stale_cache():
+    mock_org = MockOrganization()
+    mock_org.simple()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org.clear_cache()
+    org.load()
+    assert org.wait_for_refresh()
+    mock_org._account_gen(dict(name='account04'), org.root_id)
+
+    # expired but within max stale age: stale org returned, refreshed behind
+    timestamp = os.path.getmtime(org._cache_file) - 7200
+    os.utime(org._cache_file, (timestamp, timestamp))
+    stale_org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_file_max_stale_age=180)
+    stale_org.load()
+    assert stale_org.get_account('account04') is None
+    assert stale_org.wait_for_refresh(timeout=60)
+    assert os.path.getmtime(org._cache_file) > timestamp
+    fresh_org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    fresh_org.load()
+    assert fresh_org.get_account('account04') is not None
+
+    # older than max stale age: reloaded before returning
+    mock_org._account_gen(dict(name='account05'), org.root_id)
+    timestamp = os.path.getmtime(org._cache_file) - 4 * 3600
+    os.utime(org._cache_file, (timestamp, timestamp))
+    stale_org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE, cache_file_max_stale_age=180)
+    stale_org.load()
+    assert stale_org.get_account('account05') is not None
+    assert stale_org._refresh_thread is None
+
+    org.clear_cache()
+    assert stale_org._get_stale_org_dump() is None
+    org.clear_cache()
+
+
 @mock_sts
 @mock_organizations
 def test_load():
@@ -197,6 +436,22 @@ def test_load():
     assert not os.path.exists(org._cache_file)
     org.load()
     assert os.path.exists(org._cache_file)
+    assert org.rate_limiter.rate is None
+    load_stats = org.load_stats.dump()
+    for operation in [
+            'describe_organization',
+            'list_roots',
+            'list_organizational_units_for_parent',
+            'list_accounts_for_parent',
+            'list_accounts',
+            'list_policies',
+            'list_targets_for_policy']:
+        assert load_stats[operation]['calls'] > 0
+        assert load_stats[operation]['pages'] >= load_stats[operation]['calls']
+        assert load_stats[operation]['latency']['count'] > 0
+    assert load_stats['describe_organization']['calls'] == 1
+    assert load_stats['list_accounts']['throttles'] == 0
+    assert 'load_stats' not in org.dump()
     assert org.id == mock_org.org_id
     assert org.root_id == mock_org.root_id
     assert len(org.accounts) > 0
@@ -228,8 +483,82 @@ def test_load():
     org_from_cache = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
     org_from_cache.load()
     assert org.dump() == org_from_cache.dump()
+    assert org_from_cache.load_stats.dump() == dict()
     org.clear_cache()
 
+def sorted_org_dump(org):
+    org_dump = org.dump()
+    for key in ['accounts', 'org_units', 'policies']:
+        org_dump[key] = sorted(org_dump[key], key=lambda d: d['id'])
+    return org_dump
+
+
+@mock_sts
+@mock_organizations
+def test_refresh():
+    mock_org = MockOrganization()
+    mock_org.complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org.clear_cache()
+    org.load()
+
+    # change the organization behind the loaded org
+    ou01_id = org.get_org_unit_id('ou01')
+    ou02_id = org.get_org_unit_id('ou02')
+    mock_org._ou_gen(dict(name='ou02-3'), ou02_id)
+    mock_org._account_gen(dict(name='account14'), ou02_id)
+    mock_org._policy_gen('policy07', ou02_id)
+    # attach a policy to an existing org unit
+    mock_org.client.attach_policy(PolicyId=org.get_policy_id('policy02'), TargetId=ou01_id)
+    # move an existing account and detach a policy from it
+    account04 = org.get_account('account04')
+    assert 'policy04' in [p.name for p in org.get_policies_for_target('account04')]
+    mock_org.client.move_account(
+        AccountId=account04.id,
+        SourceParentId=account04.parent_id,
+        DestinationParentId=ou02_id,
+    )
+    mock_org.client.detach_policy(
+        PolicyId=org.get_policy_id('policy04'),
+        TargetId=account04.id,
+    )
+
+    # refresh reloads from the api although the cache file is fresh
+    org.refresh()
+    assert org.load_stats.dump()['list_targets_for_policy']['calls'] == len(org.policies)
+    assert [p.name for p in org.get_policies_for_target('ou01')] == [
+        'FullAWSAccess', 'policy02']
+    assert [p.name for p in org.get_policies_for_target('ou02')] == [
+        'FullAWSAccess', 'policy07']
+    assert org.get_account('account14').parent_id == ou02_id
+    assert org.get_account('account04').parent_id == ou02_id
+    assert 'policy04' not in [p.name for p in org.get_policies_for_target('account04')]
+    org_from_cache = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org_from_cache.load()
+    assert org_from_cache.dump() == org.dump()
+    full_org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    full_org.clear_cache()
+    full_org.load()
+    assert sorted_org_dump(org) == sorted_org_dump(full_org)
+
+    # incremental loads of an expired cache file are full loads
+    timestamp = os.path.getmtime(org._cache_file) - 7200
+    os.utime(org._cache_file, (timestamp, timestamp))
+    mock_org.client.detach_policy(PolicyId=org.get_policy_id('policy02'), TargetId=ou01_id)
+    org_from_cache = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org_from_cache.load(incremental=True)
+    assert [p.name for p in org_from_cache.get_policies_for_target('ou01')] == [
+        'FullAWSAccess']
+    assert org_from_cache.load_stats.dump() != dict()
+
+    # refresh without a loaded org or cache file
+    org.clear_cache()
+    new_org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    new_org.refresh()
+    assert sorted_org_dump(new_org) == sorted_org_dump(org_from_cache)
+    org.clear_cache()
+
+
 @mock_sts
 @mock_organizations
 def test_dump_accounts():
@@ -379,6 +708,39 @@ def test_get_account():
     org.clear_cache()
 
  
+@mock_sts
+@mock_organizations
+def test_build_indexes():
+    MockOrganization().complex()
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org.load()
+    for account in org.accounts:
+        assert org.get_account(account.id) is account
+        assert org.get_account(account.name) is account
+        assert org.get_account_id_by_name(account.name) == account.id
+        assert org.get_account_name_by_id(account.id) == account.name
+    for org_unit in org.org_units:
+        assert org.get_org_unit(org_unit.id) is org_unit
+        assert org.get_org_unit(org_unit.name) is org_unit
+    for policy in org.policies:
+        assert org.get_policy(policy.id) is policy
+        assert org.get_policy(policy.name) is policy
+    assert org.get_account_id_by_name('blee') is None
+    assert org.get_account_name_by_id('blee') is None
+    assert org.get_account(dict(key='bogus')) is None
+    assert org.get_org_unit('blee') is None
+
+    account = org.get_account('account01')
+    account.aliases = ['alias-account01']
+    assert org.get_account('alias-account01') is None
+    org._build_indexes()
+    assert org.get_account('alias-account01') is account
+    for key in vars(org):
+        if key.startswith('_'):
+            assert key not in org.dump()
+    org.clear_cache()
+
+
 @mock_sts
 @mock_organizations
 def test_get_org_unit_id():
@@ -481,6 +843,47 @@ def test_list_accounts_in_ou_recursive():
     org.clear_cache()
 
 
+DEEP_ORG_SPEC = """
+root:
+  - name: root
+    child_ou:
+      - name: ou01
+        accounts:
+        - name: account01
+        child_ou:
+          - name: ou01-1
+            accounts:
+            - name: account02
+            child_ou:
+              - name: ou01-1-1
+                accounts:
+                - name: account03
+                child_ou:
+                  - name: ou01-1-1-1
+                    accounts:
+                    - name: account04
+"""
+
+
+@mock_sts
+@mock_organizations
+def test_list_in_ou_recursive_deep_tree():
+    MockOrganization().build(DEEP_ORG_SPEC)
+    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org.load()
+    assert org.list_org_units_by_name() == ['ou01', 'ou01-1', 'ou01-1-1', 'ou01-1-1-1']
+    response = org.list_org_units_in_ou_recursive(org.root_id)
+    assert [ou.name for ou in response] == ['ou01', 'ou01-1', 'ou01-1-1', 'ou01-1-1-1']
+    response = org.list_org_units_in_ou_recursive('ou01-1')
+    assert [ou.name for ou in response] == ['ou01-1-1', 'ou01-1-1-1']
+    response = org.list_accounts_in_ou_recursive('ou01')
+    assert [a.name for a in response] == ['account01', 'account02', 'account03', 'account04']
+    response = org.list_accounts_in_ou_recursive('root')
+    assert len(response) == 5
+    assert org.list_org_units_in_ou_recursive('blee') == []
+    org.clear_cache()
+
+
 @mock_sts
 @mock_organizations
 def test_list_policies_by_name():
@@ -663,3 +1066,65 @@ def test_get_accounts_for_policy_recursive():
     assert sorted([a.name for a in accounts_for_policy]) == ['account07', 'account09', 'account10']
     assert org.get_accounts_for_policy_recursive('Blee') is None
     org.clear_cache()
+
+
+@mock_sts
+@mock_organizations
+def test_org_registry(monkeypatch):
+    MockOrganization().simple()
+    loads = []
+    load = orgs.Org.load
+
+    def counting_load(self, *args, **kwargs):
+        loads.append(self.access_role)
+        time.sleep(0.2)
+        load(self, *args, **kwargs)
+    monkeypatch.setattr(orgs.Org, 'load', counting_load)
+
+    registry = orgs.OrgRegistry(max_entries=2)
+    collector = []
+    threads = [
+        threading.Thread(
+            target=lambda: collector.append(registry.get_org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE))
+        ) for i in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert len(collector) == 5
+    org = collector[0]
+    assert isinstance(org, orgs.Org)
+    assert org.id is not None
+    for other_org in collector:
+        assert other_org is org
+    assert registry._load_locks == dict()
+
+    # least recently used entry is evicted
+    registry.get_org(MASTER_ACCOUNT_ID, 'role2')
+    assert registry.get_org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE) is org
+    registry.get_org(MASTER_ACCOUNT_ID, 'role3')
+    assert len(loads) == 3
+    assert registry.get_org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE) is org
+    registry.get_org(MASTER_ACCOUNT_ID, 'role2')
+    assert len(loads) == 4
+
+    # expired entries are reloaded
+    registry.ttl = 0
+    assert registry.get_org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE) is not org
+    registry.clear()
+    assert len(registry._entries) == 0
+
+    assert orgs.get_org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE) is orgs.get_org(
+        MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    orgs._registry.clear()
+    org.clear_cache()
+
+    # failed loads do not leave their lock behind
+    def failing_load(self, *args, **kwargs):
+        raise RuntimeError('load failed')
+    monkeypatch.setattr(orgs.Org, 'load', failing_load)
+    with pytest.raises(RuntimeError):
+        registry.get_org(MASTER_ACCOUNT_ID, 'role4')
+    assert registry._load_locks == dict()
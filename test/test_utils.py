@@ -1,11 +1,15 @@
+import os
+import stat
 import re
 import time
+import threading
 import datetime
 import json
 
 import yaml
 import pytest
 import boto3
+import botocore
 from botocore.exceptions import ClientError
 from moto import mock_sts, mock_organizations
 
@@ -34,6 +38,16 @@ def test_jsonfmt():
     assert isinstance(output, str)
 
 
+def test_ndjsonfmt():
+    org_spec = yaml.safe_load(SIMPLE_ORG_SPEC)
+    output = utils.ndjsonfmt(org_spec)
+    assert '\n' not in output
+    assert json.loads(output) == json.loads(utils.jsonfmt(org_spec))
+    assert utils.ndjsonfmt('one\ntwo') == '"one\\ntwo"'
+    dt = datetime.datetime.utcnow()
+    assert utils.ndjsonfmt(dict(time=dt)) == '{"time":"%s"}' % dt.isoformat()
+
+
 def test_yamlfmt():
     output = utils.yamlfmt(SIMPLE_ORG_SPEC)
     assert isinstance(output, str)
@@ -59,6 +73,92 @@ def test_assume_role_in_account():
     assert 'aws_access_key_id' in credentials
     assert 'aws_secret_access_key' in credentials
     assert 'aws_session_token' in credentials
+    assert utils.assume_role_in_account(account_id, role_name) == credentials
+    cache = utils.CredentialCache()
+    new_credentials = utils.assume_role_in_account(account_id, role_name, cache)
+    assert new_credentials != credentials
+    assert cache.get(account_id, role_name) == new_credentials
+
+
+def test_get_client(monkeypatch):
+    utils.clear_client_cache()
+    client = utils.get_client('sts', region_name='us-east-1')
+    assert utils.get_client('sts', region_name='us-east-1') is client
+    assert utils.get_client('sts', region_name='us-west-2') is not client
+    credentials = dict(
+        aws_access_key_id='key_id',
+        aws_secret_access_key='secret',
+        aws_session_token='token',
+    )
+    credentials_client = utils.get_client('sts', 'us-east-1', credentials)
+    assert credentials_client is not client
+    assert utils.get_client('sts', 'us-east-1', dict(credentials)) is credentials_client
+    config = botocore.config.Config(max_pool_connections=20)
+    config_client = utils.get_client('sts', 'us-east-1', config=config)
+    assert config_client is not client
+    assert utils.get_client('sts', 'us-east-1', config=config) is config_client
+
+    monkeypatch.setattr(utils, 'CLIENT_CACHE_SIZE', 2)
+    utils.get_client('sts', 'us-east-1')
+    utils.get_client('iam', 'us-east-1')
+    assert utils.get_client('sts', 'us-east-1') is client
+    assert utils.get_client('sts', 'us-east-1', config=config) is not config_client
+
+    utils.clear_client_cache()
+    assert utils.get_client('sts', 'us-east-1') is not client
+
+    clients = []
+    utils.queue_threads(
+        range(10),
+        lambda item: clients.append(utils.get_client('s3', 'us-east-1')),
+        thread_count=10,
+    )
+    assert len(set(id(c) for c in clients)) == 1
+    utils.clear_client_cache()
+
+
+def test_credential_cache(tmpdir):
+    credentials = dict(
+        aws_access_key_id='key_id',
+        aws_secret_access_key='secret',
+        aws_session_token='token',
+    )
+    cache = utils.CredentialCache(refresh_margin=300)
+    assert cache.get('111111111111', 'role') is None
+    cache.put('111111111111', 'role', credentials, time.time() + 3600)
+    assert cache.get('111111111111', 'role') == credentials
+    assert cache.get('111111111111', 'other_role') is None
+    cache.put('222222222222', 'role', credentials, time.time() + 200)
+    assert cache.get('222222222222', 'role') is None
+    expiration = time.time() + 3600
+    cache.put('333333333333', 'role', credentials, expiration)
+    assert cache.expiration('333333333333', 'role') == expiration
+    assert cache.expiration('444444444444', 'role') is None
+    cache.invalidate('333333333333', 'role')
+    assert cache.get('333333333333', 'role') is None
+    assert cache.expiration('333333333333', 'role') is None
+    cache.clear()
+    assert cache.get('111111111111', 'role') is None
+
+    cache_dir = os.path.join(str(tmpdir), 'credentials')
+    cache = utils.CredentialCache(cache_dir=cache_dir)
+    cache.put('111111111111', 'path/role', credentials, time.time() + 3600)
+    cache_file = os.path.join(cache_dir, 'credentials-111111111111-path_role.json')
+    assert stat.S_IMODE(os.stat(cache_file).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+    other_cache = utils.CredentialCache(cache_dir=cache_dir)
+    assert other_cache.get('111111111111', 'path/role') == credentials
+    other_cache.invalidate('111111111111', 'path/role')
+    assert not os.path.exists(cache_file)
+    other_cache.invalidate('111111111111', 'path/role')
+    cache.put('111111111111', 'path/role', credentials, time.time() + 3600)
+    os.chmod(cache_file, 0o644)
+    assert utils.CredentialCache(cache_dir=cache_dir).get('111111111111', 'path/role') is None
+    os.chmod(cache_file, 0o600)
+    for content in ['not json', '[]', '{"credentials": {}}']:
+        with open(cache_file, 'w') as f:
+            f.write(content)
+        assert utils.CredentialCache(cache_dir=cache_dir).get('111111111111', 'path/role') is None
 
 
 @mock_sts
@@ -93,6 +193,195 @@ def test_queue_threads():
         assert re.compile(r'item-[0-9]').match(item)
     assert int((stoptime - starttime) *10) < 5
 
+    # items from a generator are processed while it is still yielding
+    generator_done = []
+    def slow_generator():
+        for i in range(5):
+            time.sleep(0.1)
+            yield i
+        generator_done.append(time.perf_counter())
+    def timestamp_test(item, collector):
+        collector.append((item, time.perf_counter()))
+    collector = []
+    utils.queue_threads(
+        slow_generator(),
+        timestamp_test,
+        (collector,),
+        thread_count=5
+    )
+    assert sorted(item for item, _ in collector) == list(range(5))
+    assert len(generator_done) == 1
+    processed = dict(collector)
+    assert all(processed[i] < generator_done[0] for i in range(4))
+
+
+def test_run_tasks():
+    lock = threading.Lock()
+    active = []
+    most_active = []
+
+    def square(item, offset=0):
+        with lock:
+            active.append(item)
+            most_active.append(len(active))
+        time.sleep(0.01 * (item % 3))
+        with lock:
+            active.remove(item)
+        return item * item + offset
+
+    assert utils.run_tasks(range(20), square, thread_count=4) == [i * i for i in range(20)]
+    assert max(most_active) == 4
+    assert utils.run_tasks((i for i in range(5)), square, (1,), thread_count=0) == [
+        i * i + 1 for i in range(5)]
+    assert utils.run_tasks([], square) == []
+
+    started = []
+
+    def fail_on_three(item):
+        started.append(item)
+        time.sleep(0.01)
+        if item == 3:
+            raise ValueError(item)
+        return item
+
+    with pytest.raises(ValueError) as e:
+        utils.run_tasks(range(100), fail_on_three, thread_count=2)
+    assert e.value.args == (3,)
+    assert len(started) < 100
+
+    started = []
+    with pytest.raises(utils.TaskErrors) as e:
+        utils.run_tasks(range(10), fail_on_three, thread_count=2, error_policy=utils.COLLECT_ALL)
+    assert len(started) == 10
+    assert [(item, repr(error)) for item, error in e.value.errors] == [(3, repr(ValueError(3)))]
+    assert e.value.results == [0, 1, 2, None, 4, 5, 6, 7, 8, 9]
+
+    with pytest.raises(ValueError):
+        utils.run_tasks(range(2), square, error_policy='blee')
+    with pytest.raises(ValueError):
+        utils.run_tasks(range(2), square, executor='blee')
+    assert utils.run_tasks(range(10), pow, (2,), thread_count=2, executor='process') == [
+        i * i for i in range(10)]
+
+    with pytest.raises(ValueError):
+        utils.queue_threads(range(10), fail_on_three, thread_count=2)
+
+
+def test_iter_tasks():
+    def sleep_and_return(item):
+        time.sleep(0.01 * item)
+        if item == 7:
+            raise ValueError(item)
+        return item
+
+    assert list(utils.iter_tasks([3, 0, 2, 1], sleep_and_return, thread_count=4)) == [
+        (1, 0), (3, 1), (2, 2), (0, 3)]
+    assert sorted(utils.iter_tasks(range(10), pow, (2,), thread_count=2, executor='process')) == [
+        (i, i * i) for i in range(10)]
+    assert list(utils.iter_tasks([], sleep_and_return)) == []
+
+    started = []
+
+    def record_start(item):
+        started.append(item)
+        return sleep_and_return(item)
+
+    tasks = utils.iter_tasks(range(100), record_start, thread_count=2)
+    assert next(tasks) == (0, 0)
+    tasks.close()
+    assert len(started) < 100
+    with pytest.raises(ValueError):
+        list(utils.iter_tasks(range(10), sleep_and_return, thread_count=2))
+    with pytest.raises(ValueError):
+        next(utils.iter_tasks(range(2), sleep_and_return, executor='blee'))
+
+
+def inherited_client_state(item):
+    return len(utils._clients), hasattr(utils._thread_local, 'session'), boto3.DEFAULT_SESSION
+
+
+def test_worker_processes_do_not_share_clients():
+    utils.get_client('sts', region_name='us-east-1')
+    utils.get_thread_session()
+    assert len(utils._clients) == 1
+    assert utils.run_tasks(
+        range(4), inherited_client_state, thread_count=2, executor='process') == [
+        (0, False, None)] * 4
+    assert [result for _, result in utils.iter_tasks(
+        range(4), inherited_client_state, thread_count=2, executor='process')] == [
+        (0, False, None)] * 4
+    assert len(utils._clients) == 1
+    utils._init_worker_process()
+    assert inherited_client_state(0) == (0, False, None)
+
+
+def test_file_lock(tmpdir):
+    lock_file = os.path.join(str(tmpdir), 'lockfile')
+    collector = []
+
+    def locked_append(item):
+        with utils.file_lock(lock_file):
+            collector.append(item)
+    with utils.file_lock(lock_file):
+        thread = threading.Thread(target=locked_append, args=('second',))
+        thread.start()
+        time.sleep(0.2)
+        collector.append('first')
+    thread.join()
+    assert collector == ['first', 'second']
+    assert os.path.exists(lock_file)
+
+
+def test_rate_limiter():
+    rate_limiter = utils.RateLimiter(
+        rate=50, min_rate=10, max_rate=60, increase=5, decrease_interval=0)
+    starttime = time.perf_counter()
+    for i in range(11):
+        rate_limiter.acquire()
+    assert time.perf_counter() - starttime >= 0.19
+
+    rate_limiter.throttled()
+    assert rate_limiter.rate == 25
+    rate_limiter.throttled()
+    rate_limiter.throttled()
+    assert rate_limiter.rate == 10
+    rate_limiter.succeeded()
+    assert rate_limiter.rate == 15
+    for i in range(10):
+        rate_limiter.succeeded()
+    assert rate_limiter.rate == 60
+
+    # unlimited until throttled, then half the measured rate
+    rate_limiter = utils.RateLimiter()
+    rate_limiter.succeeded()
+    assert rate_limiter.rate is None
+    rate_limiter.throttled()
+    assert rate_limiter.rate == 1
+    rate_limiter = utils.RateLimiter(min_rate=2)
+    for i in range(10):
+        rate_limiter.acquire()
+        time.sleep(0.01)
+    rate_limiter.throttled()
+    assert 20 < rate_limiter.rate < 55
+
+    # concurrent throttles from one burst halve the rate once
+    rate_limiter = utils.RateLimiter(rate=20, decrease_interval=0.5)
+    utils.run_tasks(range(6), lambda item: rate_limiter.throttled(), thread_count=6)
+    assert rate_limiter.rate == 10
+    time.sleep(0.5)
+    rate_limiter.throttled()
+    assert rate_limiter.rate == 5
+
+    # shared among threads
+    rate_limiter = utils.RateLimiter(rate=100, burst=1)
+    starttime = time.perf_counter()
+    utils.queue_threads(
+        range(20),
+        lambda item: rate_limiter.acquire(),
+        thread_count=10,
+    )
+    assert time.perf_counter() - starttime >= 0.18
+
 
 def test_regions_for_service():
     regions = utils.regions_for_service('lambda')
@@ -125,7 +414,12 @@ def test_handle_nexttoken_and_retries():
     def mock_function_raise_value_error():
         raise ValueError('this is a value error')
 
-    org = orgs.Org(MASTER_ACCOUNT_ID, ORG_ACCESS_ROLE)
+    org = orgs.Org(
+        MASTER_ACCOUNT_ID,
+        ORG_ACCESS_ROLE,
+        retry_policy=utils.RetryPolicy(base_delay=0.01),
+        rate_limiter=utils.RateLimiter(min_rate=100),
+    )
     collector = utils.handle_nexttoken_and_retries(
         obj=org,
         collector_key='mock-key',
@@ -143,6 +437,7 @@ def test_handle_nexttoken_and_retries():
             kwargs=dict(error_code=exception_name),
         )
     assert e.value.response['Error']['Code'] == exception_name
+    assert org.rate_limiter.rate is not None
 
     exception_name = 'SomeOtherException'
     with pytest.raises(ClientError) as e:
@@ -161,3 +456,167 @@ def test_handle_nexttoken_and_retries():
             function=mock_function_raise_value_error,
             kwargs=dict(),
         )
+
+    # retries are counted per page
+    calls = []
+
+    def mock_function_throttle_each_page(**kwargs):
+        calls.append(kwargs.get('NextToken'))
+        if len(calls) % 4:
+            mock_function_raise_client_error('ThrottlingException')
+        if len(calls) < 12:
+            return {'mock-key': [len(calls)], 'NextToken': 'mock-token-str'}
+        return {'mock-key': [len(calls)]}
+
+    collector = utils.handle_nexttoken_and_retries(
+        obj=org,
+        collector_key='mock-key',
+        function=mock_function_throttle_each_page,
+    )
+    assert collector == [4, 8, 12]
+    assert calls == [None] * 4 + ['mock-token-str'] * 8
+
+
+def test_paginate():
+    calls = []
+
+    def mock_function(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            raise ClientError({'Error': {'Code': 'ThrottlingException'}}, 'mock_function')
+        if 'Token' not in kwargs:
+            return {'Items': [1, 2], 'NextPage': 'page-2'}
+        return {'Items': [3]}
+
+    pages = utils.paginate(
+        mock_function,
+        kwargs=dict(Arg='value'),
+        retry_policy=utils.RetryPolicy(base_delay=0.01),
+        rate_limiter=utils.RateLimiter(),
+        input_token='Token',
+        output_token='NextPage',
+        logger=utils.get_logger(),
+    )
+    assert next(pages) == {'Items': [1, 2], 'NextPage': 'page-2'}
+    assert len(calls) == 1
+    assert next(pages) == {'Items': [3]}
+    assert calls == [
+        dict(Arg='value'),
+        dict(Arg='value', Token='page-2'),
+        dict(Arg='value', Token='page-2'),
+    ]
+    with pytest.raises(StopIteration):
+        next(pages)
+
+    calls = []
+    stats = utils.ApiStats()
+    items = utils.paginate(
+        mock_function,
+        'Items',
+        retry_policy=utils.RetryPolicy(base_delay=0.01),
+        input_token='Token',
+        output_token='NextPage',
+        stats=stats,
+    )
+    assert list(items) == [1, 2, 3]
+    stats_dump = stats.dump()['mock_function']
+    assert stats_dump['calls'] == 1
+    assert stats_dump['pages'] == 2
+    assert stats_dump['retries'] == 1
+    assert stats_dump['errors'] == 0
+    assert stats_dump['throttles'] == 1
+    assert stats_dump['latency']['count'] == 3
+
+    # the throttle exhausting the retries is recorded as an error
+    calls = [None]
+    stats = utils.ApiStats()
+    with pytest.raises(ClientError):
+        list(utils.paginate(
+            mock_function,
+            'Items',
+            retry_policy=utils.RetryPolicy(max_retries=0),
+            stats=stats,
+        ))
+    stats_dump = stats.dump()['mock_function']
+    assert stats_dump['calls'] == 1
+    assert stats_dump['pages'] == 0
+    assert stats_dump['retries'] == 0
+    assert stats_dump['errors'] == 1
+    assert stats_dump['throttles'] == 1
+    assert stats_dump['latency']['count'] == 1
+
+
+def test_api_stats():
+    stats = utils.ApiStats()
+    assert stats.dump() == dict()
+    stats.record_call('list_accounts')
+    for i in range(1, 101):
+        stats.record_page('list_accounts', i / 100)
+    stats.record_retry('list_accounts', 0.5, throttled=True)
+    stats.record_retry('list_accounts', 0.5)
+    stats.record_error('list_accounts', 0.5, throttled=True)
+    stats.record_call('list_roots')
+    stats_dump = stats.dump()
+    assert list(stats_dump) == ['list_accounts', 'list_roots']
+    assert stats_dump['list_accounts']['calls'] == 1
+    assert stats_dump['list_accounts']['pages'] == 100
+    assert stats_dump['list_accounts']['retries'] == 2
+    assert stats_dump['list_accounts']['errors'] == 1
+    assert stats_dump['list_accounts']['throttles'] == 2
+    latency = stats_dump['list_accounts']['latency']
+    assert latency['count'] == 103
+    assert latency['min'] == 0.01
+    assert latency['max'] == 1
+    assert latency['p50'] == 0.5
+    assert latency['p90'] == 0.9
+    assert latency['p99'] == 0.99
+    assert stats_dump['list_roots'] == dict(
+        calls=1,
+        pages=0,
+        retries=0,
+        errors=0,
+        throttles=0,
+        latency=dict(count=0, total=0),
+    )
+    stats.reset()
+    assert stats.dump() == dict()
+
+
+def test_retry_policy():
+    retry_policy = utils.RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.02)
+
+    def client_error(code, status=400):
+        return ClientError(
+            {'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}},
+            'mock_function',
+        )
+
+    for code in ['ThrottlingException', 'TooManyRequestsException', 'RequestLimitExceeded']:
+        assert retry_policy.is_throttle(client_error(code))
+        assert retry_policy.is_retryable(client_error(code))
+    assert retry_policy.is_retryable(client_error('ServiceUnavailable'))
+    assert retry_policy.is_retryable(client_error('SomeServerError', 503))
+    assert not retry_policy.is_throttle(client_error('SomeServerError', 503))
+    assert not retry_policy.is_retryable(client_error('AccessDenied', 403))
+    assert not retry_policy.is_retryable(ClientError({}, 'mock_function'))
+
+    for retry_count in range(10):
+        assert 0 <= retry_policy.delay(retry_count) <= 0.02
+    assert utils.RetryPolicy(base_delay=1, max_delay=100).delay(0) <= 1
+
+    errors = [client_error('ThrottlingException'), client_error('InternalError', 500)]
+
+    def mock_function(arg, kwarg=None):
+        if errors:
+            raise errors.pop()
+        return (arg, kwarg)
+
+    assert retry_policy.call(mock_function, 'arg', kwarg='kwarg') == ('arg', 'kwarg')
+    errors = [client_error('ThrottlingException')] * 4
+    with pytest.raises(ClientError):
+        retry_policy.call(mock_function, 'arg')
+    assert errors == []
+    errors = [client_error('AccessDenied', 403)] * 2
+    with pytest.raises(ClientError):
+        retry_policy.call(mock_function, 'arg')
+    assert len(errors) == 1